@@ -3,16 +3,31 @@
 from enum import Enum
 from dataclasses import dataclass
 from typing import List, Dict
-from datetime import datetime, timedelta
-from decimal import Decimal
-import statistics
+from datetime import datetime, date, timedelta
+from collections import defaultdict
+import numpy as np
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy import func, extract
 
 from fin.models import Transaction, InstallmentPlan
 
 
+def _month_range(year: int, month: int) -> tuple:
+    """
+    Get the half-open date range covering a month.
+    
+    Comparing the raw date column against a range (instead of extracting
+    year/month) lets SQLite use idx_transactions_date.
+    
+    Returns:
+        (first day of month, first day of next month)
+    """
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
 class AlertLevel(Enum):
     """Alert severity levels."""
     INFO = "info"
@@ -60,6 +75,9 @@ class AlertDetector:
         """
         self.session = session
         self.config = config or self._default_config()
+        self._month_cache: Dict[tuple, Dict[tuple, float]] = {}
+        self._alerts_cache: Dict[tuple, List[Alert]] = {}
+        self._data_version = None
     
     def _default_config(self) -> Dict:
         """Default alert thresholds."""
@@ -85,6 +103,16 @@ class AlertDetector:
         Returns:
             List of alerts sorted by severity
         """
+        # Reuse previous results while the underlying data is unchanged
+        version = self._current_data_version()
+        if version != self._data_version:
+            self.invalidate()
+            self._data_version = version
+        
+        key = (year, month)
+        if key in self._alerts_cache:
+            return list(self._alerts_cache[key])
+        
         alerts = []
         
         alerts.extend(self._detect_gastos_hormiga(year, month))
@@ -101,28 +129,77 @@ class AlertDetector:
         }
         alerts.sort(key=lambda a: level_priority[a.level])
         
-        return alerts
+        self._alerts_cache[key] = alerts
+        return list(alerts)
     
-    def _detect_gastos_hormiga(self, year: int, month: int) -> List[Alert]:
-        """Detect high convenience store spending."""
-        start_date = datetime(year, month, 1).date()
+    def invalidate(self):
+        """Drop cached results, e.g. after writing transactions in the same session."""
+        self._month_cache.clear()
+        self._alerts_cache.clear()
+        self._data_version = None
+    
+    def _current_data_version(self) -> tuple:
+        """
+        Get a cheap fingerprint of the data the detectors read.
+        
+        Returns:
+            Tuple that changes when transactions or installment plans are
+            added, removed or updated, or when the day changes
+        """
+        transactions = self.session.query(
+            func.count(Transaction.id),
+            func.max(Transaction.updated_at)
+        ).one()
+        plans = self.session.query(
+            func.count(InstallmentPlan.id),
+            func.max(InstallmentPlan.updated_at)
+        ).one()
+        
+        # MSI alerts depend on today's date
+        return (date.today(), tuple(transactions), tuple(plans))
+    
+    def _month_totals(self, year: int, month: int) -> Dict[tuple, float]:
+        """
+        Get a month's transaction totals, querying the database only once.
         
-        # Calculate end date (last day of month)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-        else:
-            end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
+        Args:
+            year: Year to analyze
+            month: Month to analyze
         
-        transactions = self.session.query(Transaction).filter(
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
-            Transaction.category == 'gastos_hormiga'
-        ).all()
+        Returns:
+            Dict of (transaction_type, category) -> sum of absolute amounts
+        """
+        key = (year, month)
+        if key not in self._month_cache:
+            start_date, end_date = _month_range(year, month)
+            rows = self.session.query(
+                Transaction.transaction_type,
+                Transaction.category,
+                func.sum(func.abs(Transaction.amount))
+            ).filter(
+                Transaction.date >= start_date,
+                Transaction.date < end_date
+            ).group_by(Transaction.transaction_type, Transaction.category).all()
+            
+            self._month_cache[key] = {
+                (transaction_type, category): float(total or 0)
+                for transaction_type, category, total in rows
+            }
+        
+        return self._month_cache[key]
+    
+    def _detect_gastos_hormiga(self, year: int, month: int) -> List[Alert]:
+        """Detect high convenience store spending."""
+        totals = [
+            abs_total
+            for (_, category), abs_total in self._month_totals(year, month).items()
+            if category == 'gastos_hormiga'
+        ]
         
-        if not transactions:
+        if not totals:
             return []
         
-        total = sum(abs(Decimal(str(t.amount))) for t in transactions)
+        total = sum(totals)
         weekly_avg = float(total) / 4  # ~4 weeks/month
         
         threshold = self.config['gastos_hormiga_weekly']
@@ -142,25 +219,19 @@ class AlertDetector:
     
     def _detect_category_dominance(self, year: int, month: int) -> List[Alert]:
         """Detect if one category dominates spending."""
-        from collections import defaultdict
+        rows = [
+            (category, abs_total)
+            for (transaction_type, category), abs_total in self._month_totals(year, month).items()
+            if transaction_type == 'expense'
+        ]
         
-        transactions = self.session.query(Transaction).filter(
-            extract('year', Transaction.date) == year,
-            extract('month', Transaction.date) == month,
-            Transaction.transaction_type == 'expense'
-        ).all()
-        
-        if not transactions:
+        if not rows:
             return []
         
-        category_totals = defaultdict(Decimal)
-        total_expenses = Decimal('0')
-        
-        for trans in transactions:
-            amount = abs(Decimal(str(trans.amount)))
-            category = trans.category or 'Sin categoría'
-            category_totals[category] += amount
-            total_expenses += amount
+        category_totals = defaultdict(float)
+        for category, total in rows:
+            category_totals[category or 'Sin categoría'] += total
+        total_expenses = sum(category_totals.values())
         
         if total_expenses == 0:
             return []
@@ -169,7 +240,7 @@ class AlertDetector:
         top_category = max(category_totals.items(), key=lambda x: x[1])
         category_name, category_amount = top_category
         
-        percentage = float(category_amount / total_expenses * 100)
+        percentage = category_amount / total_expenses * 100
         threshold = self.config['category_dominance_pct']
         
         if percentage > threshold:
@@ -187,37 +258,45 @@ class AlertDetector:
     
     def _detect_unusual_spending(self, year: int, month: int) -> List[Alert]:
         """Detect spending >2 standard deviations from average."""
-        # Current month total
-        current_total = self.session.query(func.sum(Transaction.amount)).filter(
-            extract('year', Transaction.date) == year,
-            extract('month', Transaction.date) == month,
-            Transaction.transaction_type == 'expense'
-        ).scalar() or 0
-        
-        current_total = abs(float(current_total))
-        
-        # 6-month average
-        monthly_totals = []
-        for i in range(1, 7):
+        # Current month followed by the 6 previous months
+        window = []
+        for i in range(0, 7):
             prev_month = month - i
             prev_year = year
             if prev_month <= 0:
                 prev_month += 12
                 prev_year -= 1
-            
-            total = self.session.query(func.sum(Transaction.amount)).filter(
-                extract('year', Transaction.date) == prev_year,
-                extract('month', Transaction.date) == prev_month,
-                Transaction.transaction_type == 'expense'
-            ).scalar() or 0
-            
-            monthly_totals.append(abs(float(total)))
+            window.append((prev_year, prev_month))
+        
+        # One grouped query over the whole window
+        start_date, _ = _month_range(*window[-1])
+        _, end_date = _month_range(year, month)
+        year_col = extract('year', Transaction.date).label('year')
+        month_col = extract('month', Transaction.date).label('month')
+        
+        rows = self.session.query(
+            year_col,
+            month_col,
+            func.sum(Transaction.amount)
+        ).filter(
+            Transaction.date >= start_date,
+            Transaction.date < end_date,
+            Transaction.transaction_type == 'expense'
+        ).group_by(year_col, month_col).all()
+        
+        totals = {(int(y), int(m)): abs(float(total or 0)) for y, m, total in rows}
+        
+        current_total = totals.get((year, month), 0.0)
+        
+        # 6-month average
+        monthly_totals = [totals.get(ym, 0.0) for ym in window[1:]]
         
         if len(monthly_totals) < 3:
             return []  # Not enough data
         
-        avg = statistics.mean(monthly_totals)
-        stdev = statistics.stdev(monthly_totals) if len(monthly_totals) > 1 else 0
+        totals_array = np.asarray(monthly_totals, dtype=np.float64)
+        avg = float(totals_array.mean())
+        stdev = float(totals_array.std(ddof=1)) if totals_array.size > 1 else 0
         
         sigma = self.config['unusual_spending_sigma']
         threshold = avg + (sigma * stdev)
@@ -238,16 +317,16 @@ class AlertDetector:
     
     def _detect_fees(self, year: int, month: int) -> List[Alert]:
         """Detect fees and penalties."""
-        fees = self.session.query(Transaction).filter(
-            extract('year', Transaction.date) == year,
-            extract('month', Transaction.date) == month,
-            Transaction.transaction_type == 'fee'
-        ).all()
+        fee_totals = [
+            abs_total
+            for (transaction_type, _), abs_total in self._month_totals(year, month).items()
+            if transaction_type == 'fee'
+        ]
         
-        if not fees:
+        if not fee_totals:
             return []
         
-        total_fees = sum(abs(Decimal(str(f.amount))) for f in fees)
+        total_fees = sum(fee_totals)
         
         if total_fees > 0:
             return [Alert(
@@ -266,7 +345,13 @@ class AlertDetector:
         """Detect MSI ending soon."""
         from datetime import timedelta
         
-        plans = self.session.query(InstallmentPlan).filter(
+        plans = self.session.query(InstallmentPlan).options(
+            load_only(
+                InstallmentPlan.description,
+                InstallmentPlan.monthly_payment,
+                InstallmentPlan.end_date_calculated
+            )
+        ).filter(
             InstallmentPlan.status == 'active'
         ).all()
         
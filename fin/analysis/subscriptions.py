@@ -1,11 +1,32 @@
 """Subscription and recurring payment detection."""
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import and_, or_, func
 from fin.models import Transaction, Merchant
 from typing import List, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
+from itertools import groupby
+import re
+import numpy as np
+
+
+def _charge_stats(amounts: np.ndarray, day_numbers: np.ndarray) -> Tuple[float, float, float]:
+    """
+    Compute the numeric features of one merchant's charges.
+    
+    Args:
+        amounts: Absolute charge amounts
+        day_numbers: Charge dates as ordinal day numbers, in date order
+    
+    Returns:
+        (average amount, amount variation, average interval in days).
+        The interval is NaN for fewer than two charges.
+    """
+    avg_amount = float(amounts.mean())
+    amount_variation = float(amounts.std()) / avg_amount if avg_amount > 0 else 1.0
+    avg_interval = float(np.diff(day_numbers).mean()) if day_numbers.size > 1 else float('nan')
+    return avg_amount, amount_variation, avg_interval
 
 
 class SubscriptionDetector:
@@ -36,6 +57,9 @@ class SubscriptionDetector:
         self.min_occurrences = min_occurrences
         self.amount_tolerance = amount_tolerance
         self.period_tolerance_days = period_tolerance_days
+        self._known_re = re.compile(
+            '|'.join(re.escape(sub) for sub in self.KNOWN_SUBSCRIPTIONS)
+        )
     
     def detect_subscriptions(self, session: Session) -> List[dict]:
         """
@@ -46,24 +70,36 @@ class SubscriptionDetector:
         """
         subscriptions = []
         
-        # Group transactions by merchant
-        merchants = session.query(Merchant).all()
+        merchants = session.query(Merchant).options(
+            load_only(
+                Merchant.name,
+                Merchant.normalized_name,
+                Merchant.category,
+                Merchant.subcategory
+            )
+        ).all()
+        merchants_by_id = {m.id: m for m in merchants}
+        
+        # Fetch all charges at once, grouped by merchant in date order
+        transactions = session.query(Transaction).options(
+            load_only(Transaction.merchant_id, Transaction.date, Transaction.amount)
+        ).filter(
+            and_(
+                Transaction.merchant_id.isnot(None),
+                Transaction.transaction_type == 'expense'  # Only charges, not payments
+            )
+        ).order_by(Transaction.merchant_id, Transaction.date).all()
         
-        for merchant in merchants:
-            # Get all transactions for this merchant
-            transactions = session.query(Transaction).filter(
-                and_(
-                    Transaction.merchant_id == merchant.id,
-                    Transaction.transaction_type == 'expense'  # Only charges, not payments
-                )
-            ).order_by(Transaction.date).all()
+        for merchant_id, group in groupby(transactions, key=lambda t: t.merchant_id):
+            merchant = merchants_by_id.get(merchant_id)
+            merchant_transactions = list(group)
             
-            if len(transactions) < self.min_occurrences:
+            if merchant is None or len(merchant_transactions) < self.min_occurrences:
                 continue
             
             # Check if it's a subscription
             subscription_info = self._analyze_merchant_transactions(
-                merchant, transactions
+                merchant, merchant_transactions
             )
             
             if subscription_info:
@@ -86,18 +122,21 @@ class SubscriptionDetector:
             return None
         
         # Check if it's a known subscription
-        is_known = any(
-            sub in merchant.normalized_name.lower()
-            for sub in self.KNOWN_SUBSCRIPTIONS
+        normalized_name = merchant.normalized_name.lower()
+        is_known = bool(self._known_re.search(normalized_name))
+        
+        # Get amounts and dates as arrays
+        amounts = np.fromiter(
+            (abs(float(t.amount)) for t in transactions),
+            dtype=np.float64,
+            count=len(transactions)
         )
-        
-        # Get amounts
-        amounts = [abs(float(t.amount)) for t in transactions]
-        avg_amount = sum(amounts) / len(amounts)
-        
-        # Check amount consistency
-        amount_stdev = (sum((a - avg_amount) ** 2 for a in amounts) / len(amounts)) ** 0.5
-        amount_variation = amount_stdev / avg_amount if avg_amount > 0 else 1.0
+        day_numbers = np.fromiter(
+            (t.date.toordinal() for t in transactions),
+            dtype=np.float64,
+            count=len(transactions)
+        )
+        avg_amount, amount_variation, avg_interval = _charge_stats(amounts, day_numbers)
         
         # If too much variation, not a subscription (unless known)
         if amount_variation > self.amount_tolerance and not is_known:
@@ -109,17 +148,6 @@ class SubscriptionDetector:
         if len(dates) < 2:
             return None
         
-        # Calculate intervals between transactions
-        intervals = []
-        for i in range(1, len(dates)):
-            delta = (dates[i] - dates[i-1]).days
-            intervals.append(delta)
-        
-        if not intervals:
-            return None
-        
-        avg_interval = sum(intervals) / len(intervals)
-        
         # Check if approximately monthly (28-32 days)
         is_monthly = 20 <= avg_interval <= 40
         
@@ -154,18 +182,21 @@ class SubscriptionDetector:
         """Mark transactions that are part of subscriptions."""
         subscriptions = self.detect_subscriptions(session)
         
+        merchant_ids = [sub['merchant_id'] for sub in subscriptions]
         marked_count = 0
         
-        for sub in subscriptions:
-            # Update all transactions for this merchant as subscription
-            transactions = session.query(Transaction).filter(
-                Transaction.merchant_id == sub['merchant_id']
-            ).all()
-            
-            for trans in transactions:
-                if not trans.is_subscription:
-                    trans.is_subscription = True
-                    marked_count += 1
+        if merchant_ids:
+            # Update all transactions for these merchants in one statement
+            marked_count = session.query(Transaction).filter(
+                Transaction.merchant_id.in_(merchant_ids),
+                or_(
+                    Transaction.is_subscription == False,
+                    Transaction.is_subscription.is_(None)
+                )
+            ).update(
+                {Transaction.is_subscription: True},
+                synchronize_session=False
+            )
         
         session.commit()
         
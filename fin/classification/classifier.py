@@ -1,9 +1,13 @@
 """Main transaction classifier."""
 
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
 from .rules import RuleEngine
 from fin.models import Transaction, Merchant
-from typing import Optional
+from fin.utils import extract_merchant_name, normalize_description
+from typing import Dict, Optional, Tuple
+from dataclasses import dataclass
+import uuid
 
 # Try to import LLM classifier (optional dependency)
 try:
@@ -13,6 +17,25 @@ except ImportError:
     LLM_AVAILABLE = False
 
 
+@dataclass
+class _MerchantRef:
+    """Columns of a merchant needed while classifying a batch."""
+    id: str
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    taught: bool = False
+    # Merchants created in this batch, inserted at the end of it
+    new: bool = False
+    name: Optional[str] = None
+    normalized_name: Optional[str] = None
+    
+    def teach(self, category: str, subcategory: Optional[str]):
+        """Record a new category, written back at the end of the batch."""
+        self.category = category
+        self.subcategory = subcategory
+        self.taught = True
+
+
 class TransactionClassifier:
     """
     Main classifier that orchestrates different classification methods.
@@ -52,6 +75,27 @@ class TransactionClassifier:
         else:
             self.llm_classifier = None
         
+        # description -> (merchant_name, norm_name), reset per batch
+        self._norm_cache: Dict[str, Tuple[str, str]] = {}
+    
+    def _extract_norm(self, description: str) -> Tuple[str, str]:
+        """
+        Get the merchant name and its normalized form for a description.
+        
+        Args:
+            description: Raw transaction description
+            
+        Returns:
+            Tuple of (merchant_name, norm_name)
+        """
+        cached = self._norm_cache.get(description)
+        if cached is None:
+            merchant_name = extract_merchant_name(description)
+            # Normalize for deduplication (UPPERCASE, NO ACCENTS)
+            cached = (merchant_name, normalize_description(merchant_name))
+            self._norm_cache[description] = cached
+        return cached
+        
     def classify_transaction(self, session: Session, transaction: Transaction) -> bool:
         """
         Classify a single transaction.
@@ -66,13 +110,8 @@ class TransactionClassifier:
         if not transaction.description:
             return False
             
-        from fin.utils import extract_merchant_name, normalize_description
-        
         # 1. Identify Merchant
-        # Extract clean name
-        merchant_name = extract_merchant_name(transaction.description)
-        # Normalize for deduplication (UPPERCASE, NO ACCENTS)
-        norm_name = normalize_description(merchant_name)
+        merchant_name, norm_name = self._extract_norm(transaction.description)
         
         if not norm_name:
             return False
@@ -122,13 +161,13 @@ class TransactionClassifier:
         if not classified and self.use_llm:
             # Note: LLM works better in batch mode, but we support single transaction
             try:
-                trans_dict = {
-                    'id': transaction.id or 0,
-                    'description': transaction.description_normalized or transaction.description,
-                    'amount': float(transaction.amount) if transaction.amount else 0
-                }
+                trans_tuple = (
+                    transaction.id or 0,
+                    transaction.description_normalized or transaction.description,
+                    float(transaction.amount) if transaction.amount else 0
+                )
                 
-                results = self.llm_classifier.classify_batch([trans_dict])
+                results = self.llm_classifier.classify_batch([trans_tuple])
                 
                 if results and len(results) > 0:
                     category, subcategory, confidence = results[0]
@@ -154,7 +193,12 @@ class TransactionClassifier:
         
         return classified
         
-    def classify_batch(self, session: Session, transactions: list[Transaction]) -> int:
+    def classify_batch(
+        self,
+        session: Session,
+        transactions: list[Transaction],
+        deferred: Optional[list[Transaction]] = None
+    ) -> int:
         """
         Classify a batch of transactions.
         
@@ -163,83 +207,222 @@ class TransactionClassifier:
         Args:
             session: Database session
             transactions: List of transactions
+            deferred: If given, transactions that need the LLM are appended
+                here instead, to be sent together later with classify_deferred
             
         Returns:
             Number of transactions successfully classified
         """
+        self._norm_cache.clear()
+        
         # First pass: classify with history and rules
         unclassified = []
         count = 0
         
-        for t in transactions:
+        merchants = self._prefetch_merchants(session, transactions)
+        
+        # Scan every description against the rules once, up front
+        rule_results = self.rule_engine.classify_many(
+            [t.description_normalized for t in transactions]
+        )
+        
+        for t, rule_result in zip(transactions, rule_results):
             # Try merchant history and rules
-            if self._classify_with_rules(session, t):
+            if self._classify_with_rules(t, merchants, rule_result):
                 count += 1
             else:
                 unclassified.append(t)
         
         # Second pass: batch LLM classification for unclassified
         if unclassified and self.use_llm:
-            try:
-                # Prepare batch
-                trans_dicts = [
-                    {
-                        'id': t.id or idx,
-                        'description': t.description_normalized or t.description,
-                        'amount': float(t.amount) if t.amount else 0
-                    }
-                    for idx, t in enumerate(unclassified)
-                ]
-                
-                # Classify batch
-                results = self.llm_classifier.classify_batch(trans_dicts, max_batch_size=20)
-                
-                # Apply results
-                for t, (category, subcategory, confidence) in zip(unclassified, results):
-                    if category and confidence > 0.5:
-                        t.category = category
-                        t.subcategory = subcategory
-                        t.classification_source = 'llm'
-                        t.classification_confidence = confidence
-                        
-                        # Teach merchant
-                        if t.merchant_id:
-                            merchant = session.query(Merchant).get(t.merchant_id)
-                            if merchant:
-                                merchant.category = category
-                                merchant.subcategory = subcategory
-                        
-                        count += 1
+            if deferred is not None:
+                deferred.extend(unclassified)
+            else:
+                count += self._classify_with_llm(unclassified, {m.id: m for m in merchants.values()})
+        
+        self._save_merchants(session, merchants)
+        
+        return count
+    
+    def classify_deferred(self, session: Session, transactions: list[Transaction]) -> int:
+        """
+        Classify with the LLM the transactions deferred by classify_batch.
+        
+        Transactions from many statements go out in the same requests.
+        
+        Args:
+            session: Database session
+            transactions: Transactions collected through classify_batch's deferred
             
-            except Exception as e:
-                print(f"Batch LLM classification error: {e}")
+        Returns:
+            Number of transactions successfully classified
+        """
+        if not transactions or not self.use_llm:
+            return 0
+        
+        # Their merchants were saved by classify_batch
+        merchant_ids = {t.merchant_id for t in transactions if t.merchant_id}
+        rows = session.execute(
+            select(Merchant.id, Merchant.category, Merchant.subcategory)
+            .where(Merchant.id.in_(list(merchant_ids)))
+        ).all() if merchant_ids else []
+        merchants = {row.id: _MerchantRef(row.id, row.category, row.subcategory) for row in rows}
+        
+        count = self._classify_with_llm(transactions, merchants)
+        self._save_merchants(session, merchants)
         
         return count
     
-    def _classify_with_rules(self, session: Session, transaction: Transaction) -> bool:
-        """Helper to classify using merchant history and rules only (no LLM)."""
+    def _classify_with_llm(self, transactions: list[Transaction], merchants_by_id: Dict[str, _MerchantRef]) -> int:
+        """
+        Classify transactions with the LLM, teaching their merchants.
+        
+        Args:
+            transactions: Transactions not classified by history or rules
+            merchants_by_id: Their merchants, by ID
+            
+        Returns:
+            Number of transactions successfully classified
+        """
+        count = 0
+        try:
+            # Transactions sharing a description get the same answer,
+            # so send each description only once
+            groups: Dict[str, list[Transaction]] = {}
+            for t in transactions:
+                groups.setdefault(t.description_normalized or t.description, []).append(t)
+            
+            # Prepare batch of (id, description, amount)
+            trans_tuples = [
+                (
+                    group[0].id or idx,
+                    description,
+                    float(group[0].amount) if group[0].amount else 0
+                )
+                for idx, (description, group) in enumerate(groups.items())
+            ]
+            
+            # Classify batch
+            results = self.llm_classifier.classify_batch(trans_tuples, max_batch_size=20)
+            
+            # Apply results
+            for group, (category, subcategory, confidence) in zip(groups.values(), results):
+                if not (category and confidence > 0.5):
+                    continue
+                
+                for t in group:
+                    t.category = category
+                    t.subcategory = subcategory
+                    t.classification_source = 'llm'
+                    t.classification_confidence = confidence
+                    
+                    # Teach merchant
+                    if t.merchant_id:
+                        merchant = merchants_by_id.get(t.merchant_id)
+                        if merchant:
+                            merchant.teach(category, subcategory)
+                    
+                    count += 1
+        
+        except Exception as e:
+            print(f"Batch LLM classification error: {e}")
+        
+        return count
+    
+    def _prefetch_merchants(self, session: Session, transactions: list[Transaction]) -> Dict[str, _MerchantRef]:
+        """
+        Find the merchants of a batch with one query, and create the missing ones.
+        
+        Args:
+            session: Database session
+            transactions: List of transactions
+            
+        Returns:
+            Dict of normalized merchant name -> _MerchantRef
+        """
+        # First raw name seen for each normalized name
+        names = {}
+        for t in transactions:
+            if not t.description:
+                continue
+            merchant_name, norm_name = self._extract_norm(t.description)
+            if norm_name:
+                names.setdefault(norm_name, merchant_name)
+        
+        if not names:
+            return {}
+        
+        rows = session.execute(
+            select(Merchant.id, Merchant.normalized_name, Merchant.category, Merchant.subcategory)
+            .where(Merchant.normalized_name.in_(list(names)))
+        ).all()
+        merchants = {
+            row.normalized_name: _MerchantRef(row.id, row.category, row.subcategory)
+            for row in rows
+        }
+        
+        # Ids are generated here, so the transactions can be linked before
+        # the merchants are inserted by _save_merchants
+        for norm_name, merchant_name in names.items():
+            if norm_name not in merchants:
+                merchants[norm_name] = _MerchantRef(
+                    str(uuid.uuid4()), new=True, name=merchant_name, normalized_name=norm_name
+                )
+        
+        return merchants
+    
+    def _save_merchants(self, session: Session, merchants: Dict[str, _MerchantRef]):
+        """Write a batch's new merchants and learned categories, one executemany each."""
+        inserts = [
+            {
+                'id': m.id,
+                'name': m.name,
+                'normalized_name': m.normalized_name,
+                'category': m.category,
+                'subcategory': m.subcategory
+            }
+            for m in merchants.values()
+            if m.new
+        ]
+        if inserts:
+            session.execute(insert(Merchant), inserts)
+        
+        updates = [
+            {'id': m.id, 'category': m.category, 'subcategory': m.subcategory}
+            for m in merchants.values()
+            if m.taught and not m.new
+        ]
+        if updates:
+            session.bulk_update_mappings(Merchant, updates)
+    
+    def _classify_with_rules(
+        self,
+        transaction: Transaction,
+        merchants: Dict[str, _MerchantRef],
+        rule_result: Tuple[Optional[str], Optional[str], float]
+    ) -> bool:
+        """
+        Helper to classify using merchant history and rules only (no LLM).
+        
+        Args:
+            transaction: Transaction to classify
+            merchants: Batch merchants from _prefetch_merchants
+            rule_result: Rule engine result for the transaction's description
+            
+        Returns:
+            True if classified, False if it still needs the LLM
+        """
         if not transaction.description:
             return False
             
-        from fin.utils import extract_merchant_name, normalize_description
-        
         # 1. Identify Merchant
-        merchant_name = extract_merchant_name(transaction.description)
-        norm_name = normalize_description(merchant_name)
+        _, norm_name = self._extract_norm(transaction.description)
         
         if not norm_name:
             return False
             
-        # Find or create merchant
-        merchant = session.query(Merchant).filter_by(normalized_name=norm_name).first()
-        
-        if not merchant:
-            merchant = Merchant(
-                name=merchant_name,
-                normalized_name=norm_name
-            )
-            session.add(merchant)
-            session.flush()
+        # Merchant was found or created by _prefetch_merchants
+        merchant = merchants[norm_name]
             
         # Link transaction to merchant
         transaction.merchant_id = merchant.id
@@ -256,7 +439,7 @@ class TransactionClassifier:
             
         # 3. Try Rule Engine
         if not classified:
-            category, subcategory, confidence = self.rule_engine.classify(transaction.description_normalized)
+            category, subcategory, confidence = rule_result
             
             if category:
                 transaction.category = category
@@ -265,8 +448,7 @@ class TransactionClassifier:
                 transaction.classification_confidence = confidence
                 
                 # Auto-teach merchant
-                merchant.category = category
-                merchant.subcategory = subcategory
+                merchant.teach(category, subcategory)
                 
                 classified = True
         
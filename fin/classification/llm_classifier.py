@@ -2,10 +2,71 @@
 
 import json
 import requests
-from typing import List, Dict, Optional, Tuple
+from typing import List, Optional, Tuple
 from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import sqlite3
+import threading
 import time
 
+# Faster JSON parsing (optional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Per-user location, so results are shared across working directories
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "finbot",
+    "llm_cache.db",
+)
+
+
+CATEGORIES = {
+    "alimentacion": ["supermercado", "restaurantes", "delivery", "cafe"],
+    "transporte": ["rideshare", "gasolina", "peaje", "estacionamiento"],
+    "entretenimiento": ["streaming", "cine", "eventos"],
+    "salud": ["farmacia", "medico", "gym"],
+    "servicios": ["telefonia", "internet", "agua", "luz", "gas"],
+    "compras": ["ropa", "tiendas", "online", "departamental"],
+    "gastos_hormiga": ["conveniencia"],
+    "financiero": ["intereses", "comisiones", "retiro_efectivo"],
+    "pagos": ["transferencia"]
+}
+
+# Serialized once; compact to keep the prompt short
+CATEGORIES_JSON = json.dumps(CATEGORIES, ensure_ascii=False, separators=(',', ':'))
+
+# Only the transaction list changes between prompts
+PROMPT_PREFIX = f"""Clasifica estas transacciones bancarias en México.
+
+CATEGORÍAS VÁLIDAS:
+{CATEGORIES_JSON}
+
+TRANSACCIONES:
+"""
+
+PROMPT_SUFFIX = """
+
+INSTRUCCIONES:
+1. Para cada transacción, determina la categoría y subcategoría más apropiada
+2. Si no estás seguro, usa tu mejor juicio basado en el nombre del comercio
+3. Responde SOLO con un JSON válido, sin explicaciones adicionales
+4. Calidad del resultado: usa contexto mexicano (OXXO=gastos_hormiga, UBER=transporte, etc)
+
+FORMATO DE RESPUESTA (JSON):
+[
+  {"id": 1, "category": "categoria", "subcategory": "subcategoria", "confidence": 0.95},
+  {"id": 2, "category": "categoria", "subcategory": "subcategoria", "confidence": 0.80}
+]
+
+Responde SOLO el JSON array:"""
+
 
 class LLMClassifier:
     """Classifier using local LLM via Ollama for fallback classification."""
@@ -15,7 +76,10 @@ class LLMClassifier:
         model: str = "qwen2.5:7b",
         base_url: str = "http://localhost:11434",
         timeout: int = 30,
-        max_retries: int = 2
+        max_retries: int = 2,
+        cache_size: int = 10000,
+        max_workers: int = 4,
+        cache_path: Optional[str] = DEFAULT_CACHE_PATH
     ):
         """
         Initialize LLM classifier.
@@ -25,23 +89,53 @@ class LLMClassifier:
             base_url: Ollama API base URL
             timeout: Request timeout in seconds
             max_retries: Number of retries on failure
+            cache_size: Maximum number of cached transaction results
+            max_workers: Maximum sub-batches sent to Ollama concurrently
+            cache_path: SQLite file that keeps results across runs (None to disable)
         """
         self.model = model
         self.base_url = base_url
         self.timeout = timeout
         self.max_retries = max_retries
-        self._cache = {}  # Simple in-memory cache
+        self.cache_size = cache_size
+        # (description, amount) -> result, least recently used first
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.max_workers = max_workers
+        # Pooled HTTP connections, reused across calls
+        self._session = requests.Session()
+        self._disk_cache = self._open_disk_cache(cache_path) if cache_path else None
+    
+    def _open_disk_cache(self, cache_path: str) -> Optional[sqlite3.Connection]:
+        """Open (and create if needed) the persistent result cache."""
+        try:
+            cache_dir = os.path.dirname(cache_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            
+            # Access is serialized by self._cache_lock
+            connection = sqlite3.connect(cache_path, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, category TEXT, subcategory TEXT, "
+                "confidence REAL, model TEXT)"
+            )
+            connection.commit()
+            return connection
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: LLM cache disabled ({e})")
+            return None
     
     def classify_batch(
         self,
-        transactions: List[Dict],
+        transactions: List[Tuple],
         max_batch_size: int = 20
     ) -> List[Tuple[Optional[str], Optional[str], float]]:
         """
         Classify a batch of transactions.
         
         Args:
-            transactions: List of transaction dicts with 'id', 'description', 'amount'
+            transactions: List of (id, description, amount) tuples
             max_batch_size: Maximum transactions per batch
         
         Returns:
@@ -50,87 +144,139 @@ class LLMClassifier:
         results = []
         
         # Process in batches
-        for i in range(0, len(transactions), max_batch_size):
-            batch = transactions[i:i + max_batch_size]
-            batch_results = self._classify_batch_internal(batch)
-            results.extend(batch_results)
+        batches = [
+            transactions[i:i + max_batch_size]
+            for i in range(0, len(transactions), max_batch_size)
+        ]
+        
+        if len(batches) <= 1 or self.max_workers <= 1:
+            for batch in batches:
+                results.extend(self._classify_batch_internal(batch))
+            return results
+        
+        # Batches are independent; overlap the HTTP waits
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            for batch_results in executor.map(self._classify_batch_internal, batches):
+                results.extend(batch_results)
         
         return results
     
     def _classify_batch_internal(
         self,
-        transactions: List[Dict]
+        transactions: List[Tuple]
     ) -> List[Tuple[Optional[str], Optional[str], float]]:
         """Internal method to classify a single batch."""
         
-        # Build prompt
-        prompt = self._build_classification_prompt(transactions)
+        # Reuse cached results per transaction; only misses go to the LLM
+        results = [None] * len(transactions)
+        misses = []
+        with self._cache_lock:
+            for idx, trans in enumerate(transactions):
+                cache_key = self._get_cache_key(trans)
+                if cache_key in self._cache:
+                    self._cache.move_to_end(cache_key)
+                    results[idx] = self._cache[cache_key]
+                else:
+                    misses.append(idx)
+            
+            if misses and self._disk_cache is not None:
+                misses = self._load_from_disk_cache(transactions, misses, results)
+        
+        if not misses:
+            return results
+        
+        sub_batch = [transactions[idx] for idx in misses]
         
-        # Check cache
-        cache_key = self._get_cache_key(transactions)
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        # Build prompt
+        prompt = self._build_classification_prompt(sub_batch)
         
         # Call LLM
         try:
             response = self._call_ollama(prompt)
-            classifications = self._parse_response(response, len(transactions))
-            
-            # Cache results
-            self._cache[cache_key] = classifications
-            
-            return classifications
+            classifications = self._parse_response(response, len(sub_batch))
         
         except Exception as e:
             print(f"LLM classification error: {e}")
             # Return None for all if LLM fails
-            return [(None, None, 0.0) for _ in transactions]
+            classifications = [(None, None, 0.0) for _ in sub_batch]
+        
+        answered = []
+        with self._cache_lock:
+            for idx, classification in zip(misses, classifications):
+                results[idx] = classification
+                
+                # Cache answered results, so unanswered ones are retried later
+                if classification[0] is not None:
+                    self._remember(self._get_cache_key(transactions[idx]), classification)
+                    answered.append((self._get_disk_cache_key(transactions[idx]), *classification, self.model))
+            
+            if answered and self._disk_cache is not None:
+                try:
+                    self._disk_cache.executemany(
+                        "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                        answered
+                    )
+                    self._disk_cache.commit()
+                except sqlite3.Error as e:
+                    print(f"Warning: failed to write LLM cache: {e}")
+        
+        return results
     
-    def _build_classification_prompt(self, transactions: List[Dict]) -> str:
-        """Build prompt for transaction classification."""
+    def _load_from_disk_cache(
+        self,
+        transactions: List[Tuple],
+        misses: List[int],
+        results: List
+    ) -> List[int]:
+        """
+        Fill results from the persistent cache.
         
-        categories = {
-            "alimentacion": ["supermercado", "restaurantes", "delivery", "cafe"],
-            "transporte": ["rideshare", "gasolina", "peaje", "estacionamiento"],
-            "entretenimiento": ["streaming", "cine", "eventos"],
-            "salud": ["farmacia", "medico", "gym"],
-            "servicios": ["telefonia", "internet", "agua", "luz", "gas"],
-            "compras": ["ropa", "tiendas", "online", "departamental"],
-            "gastos_hormiga": ["conveniencia"],
-            "financiero": ["intereses", "comisiones", "retiro_efectivo"],
-            "pagos": ["transferencia"]
-        }
+        Args:
+            transactions: Transactions of the batch
+            misses: Indexes not found in the in-memory cache
+            results: Results of the batch, updated in place
+        
+        Returns:
+            Indexes still missing
+        """
+        keys = {idx: self._get_disk_cache_key(transactions[idx]) for idx in misses}
+        placeholders = ",".join("?" * len(keys))
+        try:
+            rows = self._disk_cache.execute(
+                f"SELECT key, category, subcategory, confidence FROM llm_cache WHERE key IN ({placeholders})",
+                list(keys.values())
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Warning: failed to read LLM cache: {e}")
+            return misses
         
+        found = {key: (category, subcategory, confidence) for key, category, subcategory, confidence in rows}
+        
+        still_missing = []
+        for idx in misses:
+            classification = found.get(keys[idx])
+            if classification is None:
+                still_missing.append(idx)
+            else:
+                results[idx] = classification
+                self._remember(self._get_cache_key(transactions[idx]), classification)
+        
+        return still_missing
+    
+    def _remember(self, cache_key: Tuple[str, float], classification: Tuple):
+        """Store a result in the in-memory cache, evicting the oldest entry."""
+        self._cache[cache_key] = classification
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def _build_classification_prompt(self, transactions: List[Tuple]) -> str:
+        """Build prompt for transaction classification."""
         # Build transaction list
         trans_list = []
-        for idx, trans in enumerate(transactions, 1):
-            desc = trans.get('description', 'N/A')
-            amount = trans.get('amount', 0)
+        for idx, (_, desc, amount) in enumerate(transactions, 1):
             trans_list.append(f"{idx}. {desc} - ${amount:,.2f}")
         
-        prompt = f"""Clasifica estas transacciones bancarias en México.
-
-CATEGORÍAS VÁLIDAS:
-{json.dumps(categories, indent=2, ensure_ascii=False)}
-
-TRANSACCIONES:
-{chr(10).join(trans_list)}
-
-INSTRUCCIONES:
-1. Para cada transacción, determina la categoría y subcategoría más apropiada
-2. Si no estás seguro, usa tu mejor juicio basado en el nombre del comercio
-3. Responde SOLO con un JSON válido, sin explicaciones adicionales
-4. Calidad del resultado: usa contexto mexicano (OXXO=gastos_hormiga, UBER=transporte, etc)
-
-FORMATO DE RESPUESTA (JSON):
-[
-  {{"id": 1, "category": "categoria", "subcategory": "subcategoria", "confidence": 0.95}},
-  {{"id": 2, "category": "categoria", "subcategory": "subcategoria", "confidence": 0.80}}
-]
-
-Responde SOLO el JSON array:"""
-        
-        return prompt
+        return PROMPT_PREFIX + "\n".join(trans_list) + PROMPT_SUFFIX
     
     def _call_ollama(self, prompt: str) -> str:
         """Call Ollama API."""
@@ -140,7 +286,7 @@ Responde SOLO el JSON array:"""
         payload = {
             "model": self.model,
             "prompt": prompt,
-            "stream": False,
+            "stream": True,
             "options": {
                 "temperature": 0.1,  # Low temperature for deterministic output
                 "num_predict": 500   # Limit response length
@@ -149,15 +295,14 @@ Responde SOLO el JSON array:"""
         
         for attempt in range(self.max_retries + 1):
             try:
-                response = requests.post(
+                with self._session.post(
                     url,
                     json=payload,
-                    timeout=self.timeout
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                return result.get('response', '')
+                    timeout=self.timeout,
+                    stream=True
+                ) as response:
+                    response.raise_for_status()
+                    return self._read_stream(response)
             
             except requests.exceptions.Timeout:
                 if attempt < self.max_retries:
@@ -170,6 +315,43 @@ Responde SOLO el JSON array:"""
         
         raise Exception("Max retries exceeded")
     
+    def _read_stream(self, response: requests.Response) -> str:
+        """
+        Collect a streamed Ollama response.
+        
+        Ollama sends one JSON object per line, each with the next tokens.
+        Reading stops as soon as the text holds a complete JSON array,
+        without waiting for the model to finish.
+        
+        Args:
+            response: Streaming HTTP response
+        
+        Returns:
+            Generated text received so far
+        """
+        tokens = []
+        for line in response.iter_lines():
+            if not line:
+                continue
+            
+            chunk = orjson.loads(line) if ORJSON_AVAILABLE else json.loads(line)
+            token = chunk.get('response', '')
+            tokens.append(token)
+            
+            if chunk.get('done'):
+                break
+            
+            if ']' in token:
+                text = ''.join(tokens)
+                json_str = text[text.find('['):text.rfind(']') + 1]
+                try:
+                    orjson.loads(json_str) if ORJSON_AVAILABLE else json.loads(json_str)
+                    return text
+                except ValueError:
+                    pass  # e.g. a ']' inside a string, keep reading
+        
+        return ''.join(tokens)
+    
     def _parse_response(
         self,
         response: str,
@@ -189,7 +371,10 @@ Responde SOLO el JSON array:"""
                 raise ValueError("No JSON array found in response")
             
             json_str = response[start_idx:end_idx]
-            classifications = json.loads(json_str)
+            if ORJSON_AVAILABLE:
+                classifications = orjson.loads(json_str)
+            else:
+                classifications = json.loads(json_str)
             
             # Convert to tuples
             results = []
@@ -210,14 +395,16 @@ Responde SOLO el JSON array:"""
             print(f"Response was: {response[:200]}")
             return [(None, None, 0.0) for _ in range(expected_count)]
     
-    def _get_cache_key(self, transactions: List[Dict]) -> str:
-        """Generate cache key for transactions."""
+    def _get_cache_key(self, transaction: Tuple) -> Tuple[str, float]:
+        """Generate cache key for a transaction."""
         # Use description + amount as key
-        key_parts = [
-            f"{t.get('description', '')}:{t.get('amount', 0)}"
-            for t in transactions
-        ]
-        return "|".join(key_parts)
+        _, description, amount = transaction
+        return (description, round(float(amount), 2))
+    
+    def _get_disk_cache_key(self, transaction: Tuple) -> str:
+        """Generate persistent cache key for a transaction (includes the model)."""
+        description, amount = self._get_cache_key(transaction)
+        return hashlib.blake2b(f"{self.model}|{description}|{amount}".encode('utf-8')).hexdigest()
     
     def health_check(self) -> bool:
         """Check if Ollama is running and model is available."""
@@ -231,7 +418,7 @@ Responde SOLO el JSON array:"""
                 "options": {"num_predict": 5}
             }
             
-            response = requests.post(url, json=payload, timeout=10)
+            response = self._session.post(url, json=payload, timeout=10)
             return response.status_code == 200
         
         except Exception:
@@ -5,6 +5,20 @@ import re
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
+# Hyperscan multi-pattern matcher (optional)
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# RE2 multi-pattern matcher (optional, used without Hyperscan)
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
 
 class RuleEngine:
     """Engine for classifying transactions based on deterministic rules."""
@@ -42,12 +56,104 @@ class RuleEngine:
     
     def _compile_patterns(self):
         """Compile regex patterns for efficiency."""
+        # Sort rules by priority (descending) once, not on every classify
+        self.rules.sort(key=lambda x: x.get('priority', 0), reverse=True)
+        
         for rule in self.rules:
             try:
                 rule['compiled_pattern'] = re.compile(rule['pattern'], re.IGNORECASE)
             except re.error as e:
                 print(f"Invalid regex pattern '{rule['pattern']}': {e}")
                 rule['compiled_pattern'] = None
+        
+        # Combine all valid rules into one pattern so a description is
+        # scanned by a single regex call. Each rule is a lookahead anchored
+        # at the start, tried in priority order, so the highest priority
+        # rule matching anywhere wins (not the leftmost match).
+        sorted_rules = [rule for rule in self.rules if rule['compiled_pattern']]
+        self._rule_by_group = {f"r{i}": rule for i, rule in enumerate(sorted_rules)}
+        self._combined_pattern = None
+        
+        # Numbered backreferences would point at the wrong group once
+        # the patterns are nested, so keep those rules uncombined
+        if sorted_rules and not any(re.search(r'\\[1-9]', rule['pattern']) for rule in sorted_rules):
+            combined = "|".join(
+                f"(?=[\\s\\S]*?(?P<r{i}>{rule['pattern']}))"
+                for i, rule in enumerate(sorted_rules)
+            )
+            try:
+                self._combined_pattern = re.compile(f"\\A(?:{combined})", re.IGNORECASE)
+            except re.error:
+                # e.g. inline global flags or duplicate group names;
+                # classify falls back to trying rules one by one
+                self._combined_pattern = None
+        
+        # Multi-pattern matchers: each scans a description once, however
+        # many rules there are (the combined pattern rescans it per rule)
+        self._sorted_rules = sorted_rules
+        self._hyperscan_db = self._compile_hyperscan(sorted_rules) if HYPERSCAN_AVAILABLE else None
+        self._re2_set = None
+        if self._hyperscan_db is None and RE2_AVAILABLE:
+            self._re2_set = self._compile_re2(sorted_rules)
+    
+    def _compile_hyperscan(self, rules: List[Dict]):
+        """
+        Compile rules into a Hyperscan database.
+        
+        Args:
+            rules: Valid rules sorted by priority; the index is the match id
+            
+        Returns:
+            Hyperscan database, or None if some pattern is not supported
+            by Hyperscan (e.g. backreferences or lookarounds)
+        """
+        if not rules:
+            return None
+        
+        flags = (
+            hyperscan.HS_FLAG_CASELESS
+            | hyperscan.HS_FLAG_SINGLEMATCH
+            | hyperscan.HS_FLAG_UTF8
+            | hyperscan.HS_FLAG_UCP
+        )
+        database = hyperscan.Database()
+        try:
+            database.compile(
+                expressions=[rule['pattern'].encode('utf-8') for rule in rules],
+                ids=list(range(len(rules))),
+                elements=len(rules),
+                flags=[flags] * len(rules)
+            )
+        except hyperscan.error:
+            return None
+        return database
+    
+    def _compile_re2(self, rules: List[Dict]):
+        """
+        Compile rules into an RE2 set.
+        
+        Args:
+            rules: Valid rules sorted by priority; the index is the match id
+            
+        Returns:
+            RE2 set, or None if some pattern is not supported by RE2
+            (e.g. backreferences or lookarounds)
+        """
+        if not rules:
+            return None
+        
+        options = re2.Options()
+        options.case_sensitive = False
+        # Unsupported patterns are reported by the error below, not on stderr
+        options.log_errors = False
+        rule_set = re2.Set.SearchSet(options)
+        try:
+            for rule in rules:
+                rule_set.Add(rule['pattern'])
+            rule_set.Compile()
+        except re2.error:
+            return None
+        return rule_set
     
     def classify(self, description: str) -> Tuple[Optional[str], Optional[str], float]:
         """
@@ -65,12 +171,43 @@ class RuleEngine:
         if not description:
             return None, None, 0.0
         
-        # Sort rules by priority (descending)
-        sorted_rules = sorted(self.rules, key=lambda x: x.get('priority', 0), reverse=True)
+        if self._hyperscan_db is not None:
+            # Ids are indexes into the priority-sorted rules, so the
+            # lowest matched id is the winner; keep it as matches arrive
+            best = [len(self._sorted_rules)]
+            
+            def on_match(rule_id, start, end, flags, context):
+                if rule_id < best[0]:
+                    best[0] = rule_id
+                # Nothing can beat the top rule, stop scanning
+                return rule_id == 0
+            
+            try:
+                self._hyperscan_db.scan(description.encode('utf-8'), match_event_handler=on_match)
+            except hyperscan.ScanTerminated:
+                pass
+            
+            if best[0] < len(self._sorted_rules):
+                rule = self._sorted_rules[best[0]]
+                return rule['category'], rule['subcategory'], 1.0
+            return None, None, 0.0
+        
+        if self._re2_set is not None:
+            # Ids of every matching rule; the lowest has the top priority
+            rule_ids = self._re2_set.Match(description)
+            if rule_ids:
+                rule = self._sorted_rules[min(rule_ids)]
+                return rule['category'], rule['subcategory'], 1.0
+            return None, None, 0.0
         
-        best_match = None
+        if self._combined_pattern is not None:
+            match = self._combined_pattern.match(description)
+            if match:
+                rule = self._rule_by_group[match.lastgroup]
+                return rule['category'], rule['subcategory'], 1.0
+            return None, None, 0.0
         
-        for rule in sorted_rules:
+        for rule in self.rules:
             pattern = rule.get('compiled_pattern')
             if not pattern:
                 continue
@@ -79,3 +216,19 @@ class RuleEngine:
                 return rule['category'], rule['subcategory'], 1.0
         
         return None, None, 0.0
+    
+    def classify_many(self, descriptions: List[str]) -> List[Tuple[Optional[str], Optional[str], float]]:
+        """
+        Classify several descriptions, scanning each distinct one only once.
+        
+        Args:
+            descriptions: Transaction descriptions (normalized)
+            
+        Returns:
+            List of (category, subcategory, confidence), one per description
+        """
+        results = {}
+        for description in descriptions:
+            if description not in results:
+                results[description] = self.classify(description)
+        return [results[description] for description in descriptions]
@@ -1,26 +1,81 @@
 """Command-line interface for finbot."""
 
 import click
+import contextlib
 from rich.console import Console
 from rich.progress import Progress
 from rich.table import Table
+from rich.text import Text
 import os
+import functools
+import logging
 import hashlib
+import itertools
+import mmap
+import re
+import uuid
+from datetime import date, datetime, timedelta
 from pathlib import Path
+from typing import Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from sqlalchemy import case, func, insert, select, inspect as sa_inspect
 
 from fin import __version__
 from fin.models import init_db, get_session, ProcessingLog, Statement, Transaction, InstallmentPlan
 from fin.extractors import BankDetector
 from fin.classification import TransactionClassifier
+from fin.cli_correct import correct_transactions
+from fin.export import DataExporter
+from fin.utils.duplicates import detect_all
+
+# Faster file hashing (optional)
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
 
 
 console = Console()
+logger = logging.getLogger(__name__)
+
+# Error details (tracebacks) are written here instead of the console
+LOG_FILE = os.path.join('data', 'fin.log')
+
+# Algorithm of the content hash used to detect already processed files
+HASH_ALGORITHM = 'blake3' if BLAKE3_AVAILABLE else 'sha256'
+
+# Logged hash of files that failed under --force and were never hashed
+UNHASHED = b''
+
+# Files at least this big are hashed through mmap
+MMAP_HASH_THRESHOLD = 10 * 1024 * 1024
+
+# Smaller files are read into memory once, then hashed and parsed from there
+IN_MEMORY_MAX_SIZE = MMAP_HASH_THRESHOLD
+
+# Upper bound of worker processes parsing PDFs
+MAX_PARSE_WORKERS = 8
+
+# Processed files (successful or not) written per commit
+COMMIT_EVERY_FILES = 20
+
+# Files between updates of the progress bar's file name
+PROGRESS_DESCRIPTION_EVERY = 8
+
+# Hashes of already processed files, set in each parse worker
+_known_hashes = frozenset()
+_legacy_hashes = frozenset()
+
+# Write buffer of export output files
+EXPORT_BUFFER_SIZE = 128 * 1024
 
 
 @click.group()
 @click.version_option(version=__version__)
 def cli():
     """Finbot - Sistema de Inteligencia Financiera Personal"""
+    _configure_logging()
     # Initialize database on first run
     init_db()
 
@@ -36,150 +91,589 @@ def process(directory, force):
     """
     console.print(f"\n[bold blue]Processing bank statements from: {directory}[/bold blue]\n")
     
-    # Get all PDF files
-    pdf_files = list(Path(directory).glob('*.pdf')) + list(Path(directory).glob('*.PDF'))
+    # Get all PDF files (any extension case) in a single directory pass,
+    # as (path, name, stat) reused for the whole run; on Windows the stat
+    # comes with the directory listing
+    with os.scandir(directory) as entries:
+        pdf_files = sorted(
+            (entry.path, entry.name, entry.stat()) for entry in entries
+            # Name first: is_file() may need a stat where the file
+            # system doesn't report entry types
+            if entry.name.lower().endswith('.pdf') and entry.is_file()
+        )
     
     if not pdf_files:
         console.print("[yellow]No PDF files found in directory.[/yellow]")
         return
     
-    detector = BankDetector()
-    classifier = TransactionClassifier()
     session = get_session()
     
     total_processed = 0
     total_statements = 0
     total_transactions = 0
     total_installments = 0
+    total_duplicates = 0
+    total_reversals = 0
+    files_since_commit = 0
+    total_llm_classified = 0
+    # Written since the last commit, finished then: statements to check
+    # for duplicates, and transactions left for the LLM
+    new_statement_ids = []
+    llm_pending = []
+    classifier = None
     
     try:
-        with Progress() as progress:
+        # Rich redraws on its own timer; a low rate keeps rendering cheap
+        with Progress(refresh_per_second=4, transient=len(pdf_files) > 100) as progress:
             task = progress.add_task("[cyan]Processing files...", total=len(pdf_files))
             
-            for pdf_file in pdf_files:
-                progress.update(task, description=f"[cyan]Processing: {pdf_file.name}")
-                
-                # Calculate file hash
-                file_hash = _calculate_file_hash(str(pdf_file))
-                
-                # Check if already processed
-                if not force:
-                    existing = session.query(ProcessingLog).filter_by(file_hash=file_hash).first()
-                    if existing:
-                        console.print(f"[dim]Skipping {pdf_file.name} (already processed)[/dim]")
-                        progress.advance(task)
-                        continue
-                
-                # Detect bank
-                extractor = detector.detect(str(pdf_file))
-                if not extractor:
-                    console.print(f"[red]✗ Could not detect bank for {pdf_file.name}[/red]")
-                    _log_processing(session, str(pdf_file), file_hash, None, 'error', 'Bank not detected')
-                    progress.advance(task)
+            # Stats of the logged files, loaded up front in one query
+            processed_hashes = set()
+            processed_stats = set()
+            if not force:
+                # Only rows for this directory can match a listed path; a
+                # range (not LIKE) so the covering index serves it
+                prefix = os.path.join(directory, '')
+                processed_stats = set(session.execute(
+                    select(ProcessingLog.file_path, ProcessingLog.file_size, ProcessingLog.mtime_ns)
+                    .where(
+                        ProcessingLog.file_path >= prefix,
+                        ProcessingLog.file_path < prefix[:-1] + chr(ord(prefix[-1]) + 1)
+                    )
+                ).tuples())
+            
+            # Unchanged files already logged are skipped without hashing
+            to_parse = []
+            skipped_names = []
+            for pdf_path, pdf_name, stat in pdf_files:
+                if not force and (pdf_path, stat.st_size, stat.st_mtime_ns) in processed_stats:
+                    skipped_names.append(pdf_name)
                     continue
-                
-                # Parse file
-                try:
-                    statement, transactions, installments = extractor.parse(str(pdf_file))
-                    
-                    if statement is None:
-                        console.print(f"[red]✗ Failed to parse {pdf_file.name}[/red]")
-                        _log_processing(session, str(pdf_file), file_hash, extractor.bank_name, 'error', 'Parsing failed')
-                        progress.advance(task)
-                        continue
-                    
-                    # Classify transactions
-                    classified_count = classifier.classify_batch(session, transactions)
-                    
-                    # Save to database
-                    session.add(statement)
-                    session.flush()  # Get statement ID
-                    
-                    for trans in transactions:
-                        trans.statement_id = statement.id
-                        session.add(trans)
-                    
-                    for plan in installments:
-                        plan.statement_id = statement.id
-                        session.add(plan)
-                    
-                    # Log processing
-                    _log_processing(
-                        session,
-                        str(pdf_file),
-                        file_hash,
-                        extractor.bank_name,
-                        'success',
-                        None,
-                        1,
-                        len(transactions),
-                        len(installments)
+                if not stat.st_ino:
+                    # Windows listings leave out the inode, which _stat_key needs
+                    stat = os.stat(pdf_path)
+                to_parse.append((pdf_path, pdf_name, stat))
+            
+            # Still a line per skipped file, but written in one go: on a
+            # rerun, rendering each line separately dominated the run time
+            if skipped_names:
+                console.out(
+                    "\n".join(f"Skipping {pdf_name} (already processed)" for pdf_name in skipped_names),
+                    style="dim",
+                    highlight=False
+                )
+                progress.advance(task, len(skipped_names))
+            
+            # Hashes are only needed for files that are new or changed, so
+            # an unchanged directory costs no more than its listing
+            legacy_hashes = frozenset()
+            if not force and to_parse:
+                # Rows without an algorithm predate it and are SHA-256
+                processed_hashes = set(session.scalars(
+                    select(ProcessingLog.file_hash).distinct().where(
+                        func.coalesce(ProcessingLog.hash_algo, 'sha256') == HASH_ALGORITHM
                     )
-                    
-                    session.commit()
-                    
-                    # Detect duplicates and reversals
-                    from fin.utils.duplicates import detect_all
-                    detection_results = detect_all(session, statement.id)
-                    session.commit()
-                    
-                    # Display results
-                    console.print(f"\n[green]✓ {pdf_file.name}[/green]")
-                    console.print(f"  [dim]Bank: {extractor.bank_name.upper()}[/dim]")
-                    console.print(f"  [dim]Period: {statement.period_start} to {statement.period_end}[/dim]")
-                    console.print(f"  [cyan]✓ Summary extracted[/cyan]")
-                    console.print(f"  [cyan]✓ {len(transactions)} transactions ({classified_count} classified)[/cyan]")
-                    console.print(f"  [cyan]✓ {len(installments)} installment plans[/cyan]")
-                    if detection_results['total_flagged'] > 0:
-                        console.print(f"  [yellow]⚠ {detection_results['duplicates']} duplicates, {detection_results['reversals']} reversals flagged[/yellow]")
-                    
-                    total_processed += 1
-                    total_statements += 1
-                    total_transactions += len(transactions)
-                    total_installments += len(installments)
-                    
-                except Exception as e:
-                    console.print(f"[red]✗ Error processing {pdf_file.name}: {e}[/red]")
-                    _log_processing(session, str(pdf_file), file_hash, extractor.bank_name, 'error', str(e))
-                    session.rollback()
+                ))
+                # Files logged before blake3 was installed keep their SHA-256
+                # until rehashed (scripts/rehash_processing_log.py); they are
+                # still recognized by it meanwhile
+                if HASH_ALGORITHM != 'sha256':
+                    legacy_hashes = frozenset(session.scalars(
+                        select(ProcessingLog.file_hash).distinct().where(
+                            func.coalesce(ProcessingLog.hash_algo, 'sha256') == 'sha256'
+                        )
+                    ))
+            
+            # Each distinct file is parsed once, even if listed twice:
+            # stat key -> its listed (path, name, stat)
+            listed = {}
+            for pdf_file in to_parse:
+                listed.setdefault(_stat_key(pdf_file[2]), []).append(pdf_file)
+            
+            # The classifier is only needed if there is something to parse.
+            # Its Ollama health check can take seconds (model load), so it
+            # is set up in the background while the files are parsed
+            classifier_future = None
+            if listed:
+                setup = ThreadPoolExecutor(max_workers=1)
+                classifier_future = setup.submit(_get_classifier)
+                setup.shutdown(wait=False)
+            
+            # Hashing and parsing run in worker processes; classification
+            # and database writes stay here, on the session's thread. No
+            # more workers than files
+            workers = max(1, min(os.cpu_count() or 1, MAX_PARSE_WORKERS, len(listed)))
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_parse_worker, initargs=(frozenset(processed_hashes), legacy_hashes)
+            ) as executor:
+                futures = {
+                    executor.submit(_parse_one, files[0][0], not force, files[0][2].st_size): stat_key
+                    for stat_key, files in listed.items()
+                }
+                classifier = classifier_future.result() if classifier_future else None
                 
-                progress.advance(task)
+                # Results are written as they complete, so a slow file
+                # doesn't hold back the ones parsed after it
+                files_seen = itertools.count()
+                for future in as_completed(futures):
+                    parse_result = future.result()
+                    for pdf_path, pdf_name, stat in listed[futures[future]]:
+                        file_hash, bank_name, statement_columns, transaction_columns, installment_columns, error = parse_result
+                        
+                        if next(files_seen) % PROGRESS_DESCRIPTION_EVERY == 0:
+                            progress.update(task, description=f"[cyan]Processing: {pdf_name}")
+                        
+                        # Check if already processed (the worker also reports
+                        # files matched by their legacy SHA-256)
+                        if not force and (file_hash in processed_hashes or error == 'Already processed'):
+                            console.print(f"[dim]Skipping {pdf_name} (already processed)[/dim]", highlight=False)
+                            progress.advance(task)
+                            continue
+                        # Every outcome below is logged under this hash
+                        processed_hashes.add(file_hash)
+                        
+                        # Commit in groups of files (failed ones included) to
+                        # save a sync per file
+                        if files_since_commit == COMMIT_EVERY_FILES:
+                            batch_results = _commit_batch(session, classifier, new_statement_ids, llm_pending)
+                            total_duplicates += batch_results['duplicates']
+                            total_reversals += batch_results['reversals']
+                            total_llm_classified += batch_results['llm_classified']
+                            files_since_commit = 0
+                        files_since_commit += 1
+                        
+                        if bank_name is None:
+                            console.print(f"[red]✗ Could not detect bank for {pdf_name}[/red]")
+                            _log_processing(session, pdf_path, file_hash, stat, None, 'error', 'Bank not detected')
+                            progress.advance(task)
+                            continue
+                        
+                        if statement_columns is None:
+                            if error == 'Parsing failed':
+                                console.print(f"[red]✗ Failed to parse {pdf_name} (details in {LOG_FILE})[/red]")
+                            else:
+                                console.print(f"[red]✗ Error processing {pdf_name}: {error}[/red]")
+                            _log_processing(session, pdf_path, file_hash, stat, bank_name, 'error', error)
+                            progress.advance(task)
+                            continue
+                        
+                        llm_pending_before = len(llm_pending)
+                        try:
+                            # Savepoint: a failing file is undone without losing
+                            # the uncommitted files before it
+                            with session.begin_nested():
+                                # Ids set here so LLM results can update the rows later
+                                transactions = [
+                                    Transaction(id=str(uuid.uuid4()), **columns) for columns in transaction_columns
+                                ]
+                                installments = [InstallmentPlan(**columns) for columns in installment_columns]
+                                
+                                # Classify transactions; the ones needing the LLM
+                                # are sent with the rest of the batch at commit
+                                classified_count = classifier.classify_batch(session, transactions, deferred=llm_pending)
+                                
+                                # Save to database: plain INSERTs, with the statement
+                                # id generated here so nothing needs flushing first
+                                statement_id = str(uuid.uuid4())
+                                session.execute(insert(Statement), dict(statement_columns, id=statement_id))
+                                
+                                # One executemany per table instead of a unit-of-work row each
+                                if transactions:
+                                    session.execute(
+                                        insert(Transaction),
+                                        [dict(_set_columns(t), statement_id=statement_id) for t in transactions]
+                                    )
+                                
+                                if installments:
+                                    session.execute(
+                                        insert(InstallmentPlan),
+                                        [dict(_set_columns(p), statement_id=statement_id) for p in installments]
+                                    )
+                                
+                                # Log processing
+                                _log_processing(
+                                    session,
+                                    pdf_path,
+                                    file_hash,
+                                    stat,
+                                    bank_name,
+                                    'success',
+                                    None,
+                                    1,
+                                    len(transactions),
+                                    len(installments)
+                                )
+                            
+                        except Exception as e:
+                            console.print(f"[red]✗ Error processing {pdf_name}: {e}[/red]")
+                            logger.exception("Error processing %s", pdf_path)
+                            del llm_pending[llm_pending_before:]
+                            # Own savepoint too: if the session itself is broken,
+                            # the files already written in this batch survive
+                            try:
+                                with session.begin_nested():
+                                    _log_processing(session, pdf_path, file_hash, stat, bank_name, 'error', str(e))
+                            except Exception as log_error:
+                                console.print(f"[red]✗ Could not log error for {pdf_name}: {log_error}[/red]")
+                            progress.advance(task)
+                            continue
+                        
+                        new_statement_ids.append(statement_id)
+                        
+                        # Display results: one line per file, without Rich's
+                        # highlighting pass, so output stays cheap on big runs
+                        # (date columns store dates; extractors may have set datetimes)
+                        period_start, period_end = (
+                            value.date() if isinstance(value, datetime) else value
+                            for value in (statement_columns.get('period_start'), statement_columns.get('period_end'))
+                        )
+                        console.print(
+                            f"[green]✓ {pdf_name}[/green] [dim]{bank_name.upper()} {period_start} → {period_end}[/dim]"
+                            f" [cyan]{len(transactions)} transactions ({classified_count} classified), {len(installments)} MSI[/cyan]",
+                            highlight=False
+                        )
+                        
+                        total_processed += 1
+                        total_statements += 1
+                        total_transactions += len(transactions)
+                        total_installments += len(installments)
+                        
+                        progress.advance(task)
+        
+        batch_results = _commit_batch(session, classifier, new_statement_ids, llm_pending)
+        total_duplicates += batch_results['duplicates']
+        total_reversals += batch_results['reversals']
+        total_llm_classified += batch_results['llm_classified']
         
         # Summary
         console.print(f"\n[bold green]Processing complete![/bold green]")
         console.print(f"[dim]Files processed: {total_processed}[/dim]")
         console.print(f"[dim]Statements: {total_statements}[/dim]")
         console.print(f"[dim]Transactions: {total_transactions}[/dim]")
-        console.print(f"[dim]Installment plans: {total_installments}[/dim]\n")
+        console.print(f"[dim]Installment plans: {total_installments}[/dim]")
+        if total_llm_classified:
+            console.print(f"[dim]Classified by LLM: {total_llm_classified}[/dim]")
+        if total_duplicates or total_reversals:
+            console.print(f"[yellow]⚠ {total_duplicates} duplicates, {total_reversals} reversals flagged[/yellow]")
+        console.print()
         
+    except KeyboardInterrupt:
+        # Completed files are kept even if the run is interrupted. Their
+        # LLM classification and duplicate check are skipped rather than
+        # making Ctrl-C wait on Ollama
+        try:
+            session.commit()
+        except Exception:
+            logger.exception("Could not save the files completed before the interrupt")
+            session.rollback()
+        raise
+    except Exception:
+        session.rollback()
+        raise
     finally:
         session.close()
 
 
-def _calculate_file_hash(file_path: str) -> str:
-    """Calculate SHA256 hash of file."""
-    sha256 = hashlib.sha256()
+def _commit_batch(session, classifier, statement_ids: list, llm_pending: list) -> dict:
+    """
+    Finish the files written since the last commit, then commit.
+    
+    Their transactions left for the LLM are classified in shared requests,
+    and their statements are checked for duplicates and reversals at once.
+    
+    Args:
+        session: Database session
+        classifier: TransactionClassifier (None if nothing was parsed)
+        statement_ids: IDs of the new statements (cleared afterwards)
+        llm_pending: Transactions deferred by classify_batch (cleared afterwards)
+    
+    Returns:
+        Dictionary with detection results and the LLM classified count
+    """
+    llm_classified = 0
+    if llm_pending:
+        llm_classified = classifier.classify_deferred(session, llm_pending)
+        # The rows are already inserted; write the results over them
+        updates = [
+            {
+                'id': t.id,
+                'category': t.category,
+                'subcategory': t.subcategory,
+                'classification_source': t.classification_source,
+                'classification_confidence': t.classification_confidence
+            }
+            for t in llm_pending
+            if t.classification_source == 'llm'
+        ]
+        if updates:
+            session.bulk_update_mappings(Transaction, updates)
+        llm_pending.clear()
+    
+    if statement_ids:
+        detection_results = detect_all(session, statement_ids=statement_ids)
+        statement_ids.clear()
+    else:
+        detection_results = {'duplicates': 0, 'reversals': 0, 'total_flagged': 0}
+    session.commit()
+    return dict(detection_results, llm_classified=llm_classified)
+
+
+def _configure_logging():
+    """
+    Write the package's log records to LOG_FILE.
+    
+    Also run in each parse worker, which has no handlers when processes
+    are started with spawn instead of fork.
+    """
+    fin_logger = logging.getLogger('fin')
+    if fin_logger.handlers:
+        return
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+    # delay: the file is only opened (per process) once something is logged
+    handler = logging.FileHandler(LOG_FILE, encoding='utf-8', delay=True)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    fin_logger.addHandler(handler)
+    fin_logger.setLevel(logging.INFO)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_classifier() -> TransactionClassifier:
+    """
+    Get the transaction classifier, built once per process.
+    
+    Later runs in the same process (scripts, tests) reuse its rules and
+    LLM caches instead of loading them again.
+    """
+    return TransactionClassifier()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_detector() -> BankDetector:
+    """Get the bank detector, built once per (worker) process."""
+    return BankDetector()
+
+
+def _stat_key(stat: os.stat_result) -> tuple:
+    """Identify a file version by (device, inode, size, mtime)."""
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _init_parse_worker(known_hashes: frozenset, legacy_hashes: frozenset = frozenset()):
+    """
+    Set up a parse worker process.
+    
+    Args:
+        known_hashes: Hashes of the files already processed, sent once per
+            worker instead of with every file
+        legacy_hashes: SHA-256 hashes of files processed before the current
+            HASH_ALGORITHM was in use
+    """
+    global _known_hashes, _legacy_hashes
+    _known_hashes = known_hashes
+    _legacy_hashes = legacy_hashes
+    _configure_logging()
+
+
+def _parse_one(pdf_path: str, always_hash: bool = True, file_size: Optional[int] = None) -> tuple:
+    """
+    Hash, detect and parse one PDF (runs in a worker process).
+    
+    Models are returned as dicts of their set columns, so no ORM state
+    is pickled across processes.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        always_hash: Hash the file even if it can't be parsed (needed for
+            the duplicate check; with --force only parsed files are hashed)
+        file_size: Size from the listing's stat (looked up here if None)
+    
+    Returns:
+        Tuple of (file_hash, bank_name, statement, transactions, installments, error),
+        statement being None when the file could not be parsed, and
+        file_hash being UNHASHED when it was not computed; files whose hash
+        is in _known_hashes (or whose SHA-256 is in _legacy_hashes) are
+        returned unparsed
+    """
+    data = _read_if_small(pdf_path, file_size)
+    if data is not None:
+        hash_file = functools.partial(_calculate_data_hash, data)
+    else:
+        # Too big to keep in memory: read twice (hash, parse) from disk
+        _prefetch_file(pdf_path)
+        hash_file = functools.partial(_calculate_file_hash, pdf_path)
+    
+    # Hashed before parsing, so copies of already processed files (the
+    # same statement saved twice) are skipped without being parsed
+    file_hash = hash_file() if always_hash else UNHASHED
+    if file_hash in _known_hashes or (
+        _legacy_hashes and hash_file(algorithm='sha256') in _legacy_hashes
+    ):
+        return file_hash, None, None, [], [], 'Already processed'
+    
+    extractor = _get_detector().detect(pdf_path, data)
+    if not extractor:
+        return file_hash, None, None, [], [], 'Bank not detected'
+    
+    try:
+        statement, transactions, installments = extractor.parse(pdf_path, data)
+    except Exception as e:
+        logger.exception("Error parsing %s", pdf_path)
+        return file_hash, extractor.bank_name, None, [], [], str(e)
+    
+    if statement is None:
+        return file_hash, extractor.bank_name, None, [], [], 'Parsing failed'
+    
+    if not always_hash:
+        file_hash = hash_file()
+    
+    return (
+        file_hash,
+        extractor.bank_name,
+        _set_columns(statement),
+        [_set_columns(t) for t in transactions],
+        [_set_columns(p) for p in installments],
+        None
+    )
+
+
+def _read_if_small(file_path: str, file_size: Optional[int] = None) -> Optional[bytes]:
+    """Read a whole file if it is smaller than IN_MEMORY_MAX_SIZE, else None."""
+    if file_size is not None and file_size >= IN_MEMORY_MAX_SIZE:
+        return None
+    with open(file_path, 'rb') as f:
+        if file_size is None and os.fstat(f.fileno()).st_size >= IN_MEMORY_MAX_SIZE:
+            return None
+        return f.read()
+
+
+def _prefetch_file(file_path: str):
+    """
+    Ask the kernel to read a file ahead, since it is read twice (hash, parse).
+    
+    Only available on POSIX systems; elsewhere this does nothing.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass  # Only a hint
+
+
+@functools.lru_cache(maxsize=None)
+def _column_keys(model: type) -> frozenset:
+    """Get the attribute names of a model's columns, looked up once per model."""
+    return frozenset(attr.key for attr in sa_inspect(model).column_attrs)
+
+
+def _set_columns(obj) -> dict:
+    """Get the column attributes explicitly set on a model instance."""
+    keys = _column_keys(type(obj))
+    # The instance dict holds only the attributes set, next to ORM state;
+    # one pass over it beats walking every column of the mapper
+    return {key: value for key, value in obj.__dict__.items() if key in keys}
+
+
+def _calculate_file_hash(file_path: str, algorithm: str = HASH_ALGORITHM) -> bytes:
+    """
+    Calculate the content hash of a file.
+    
+    Args:
+        file_path: Path to the file
+        algorithm: 'blake3' (needs the blake3 package) or 'sha256'
+    
+    Returns:
+        Raw digest (32 bytes)
+    """
+    if algorithm == 'blake3':
+        # Memory-mapped, multi-threaded tree hash in a single call
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        hasher.update_mmap(file_path)
+        return hasher.digest()
+    
     with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b''):
-            sha256.update(chunk)
-    return sha256.hexdigest()
+        # Large files: hash the mapped pages in one call, without copies
+        if os.fstat(f.fileno()).st_size >= MMAP_HASH_THRESHOLD:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return hashlib.sha256(mm).digest()
+            except (OSError, ValueError):
+                pass  # Not mappable here, use buffered reads
+        
+        # Python 3.11+: read and hash loop runs in C
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').digest()
+        
+        # Older Pythons: 1 MiB reads into one reused buffer
+        sha256 = hashlib.sha256()
+        buffer = bytearray(1 << 20)
+        view = memoryview(buffer)
+        while size := f.readinto(buffer):
+            sha256.update(view[:size])
+        return sha256.digest()
+
 
+def _calculate_data_hash(data: bytes, algorithm: str = HASH_ALGORITHM) -> bytes:
+    """
+    Calculate the content hash of a file already read into memory.
+    
+    Args:
+        data: Content of the file
+        algorithm: 'blake3' (needs the blake3 package) or 'sha256'
+    
+    Returns:
+        Raw digest (32 bytes), the same _calculate_file_hash gives
+    """
+    if algorithm == 'blake3':
+        return blake3.blake3(data, max_threads=blake3.blake3.AUTO).digest()
+    return hashlib.sha256(data).digest()
 
-def _log_processing(session, file_path, file_hash, bank, status, error_msg=None, 
+
+def _log_processing(session, file_path, file_hash, file_stat, bank, status, error_msg=None, 
                     statements=0, transactions=0, installments=0):
-    """Log file processing result."""
-    log = ProcessingLog()
-    log.file_path = file_path
-    log.file_hash = file_hash
-    log.file_size = os.path.getsize(file_path)
-    log.bank_detected = bank
-    log.processing_status = status
-    log.error_message = error_msg
-    log.statements_created = statements
-    log.transactions_created = transactions
-    log.installments_created = installments
+    """Log file processing result (file_stat: os.stat_result taken when listing)."""
+    # Plain INSERT, no ORM instance to track
+    session.execute(insert(ProcessingLog), dict(
+        file_path=file_path,
+        file_hash=file_hash,
+        hash_algo=HASH_ALGORITHM,
+        file_size=file_stat.st_size,
+        mtime_ns=file_stat.st_mtime_ns,
+        bank_detected=bank,
+        processing_status=status,
+        error_message=error_msg,
+        statements_created=statements,
+        transactions_created=transactions,
+        installments_created=installments
+    ))
+
+
+@functools.lru_cache(maxsize=64)
+def _month_range(month: str) -> Tuple[date, date]:
+    """
+    Get the dates bounding a month.
+    
+    Args:
+        month: Month as YYYY-MM
     
-    session.add(log)
+    Returns:
+        Tuple of (first day, first day of the next month)
+    
+    Raises:
+        ValueError: If month is not a valid YYYY-MM
+    """
+    year, month_num = (int(part) for part in month.split('-'))
+    start_date = date(year, month_num, 1)
+    if month_num == 12:
+        end_date = date(year + 1, 1, 1)
+    else:
+        end_date = date(year, month_num + 1, 1)
+    return start_date, end_date
 
 
 @cli.command()
@@ -199,65 +693,69 @@ def transactions(month, category, min_amount, max_amount, limit):
     session = get_session()
     
     try:
-        # Build query
-        query = session.query(Transaction).join(Statement)
+        # Build query: only the displayed columns, no ORM objects
+        query = select(
+            Transaction.date,
+            Transaction.description,
+            Transaction.amount,
+            Transaction.transaction_type
+        ).join(Statement)
         
         # Apply filters
         if month:
             try:
-                year, month_num = month.split('-')
-                from datetime import date
-                start_date = date(int(year), int(month_num), 1)
-                # Get last day of month
-                if int(month_num) == 12:
-                    end_date = date(int(year) + 1, 1, 1)
-                else:
-                    end_date = date(int(year), int(month_num) + 1, 1)
-                
-                query = query.filter(Transaction.date >= start_date, Transaction.date < end_date)
+                start_date, end_date = _month_range(month)
+                query = query.where(Transaction.date >= start_date, Transaction.date < end_date)
             except ValueError:
                 console.print("[red]Invalid month format. Use YYYY-MM[/red]")
                 return
         
         if category:
-            query = query.filter(Transaction.category == category)
+            query = query.where(Transaction.category == category)
         
         if min_amount is not None:
-            query = query.filter(Transaction.amount >= min_amount)
+            query = query.where(Transaction.amount >= min_amount)
         
         if max_amount is not None:
-            query = query.filter(Transaction.amount <= max_amount)
+            query = query.where(Transaction.amount <= max_amount)
         
         # Order by date descending
         query = query.order_by(Transaction.date.desc())
         
         # Apply limit
-        results = query.limit(limit).all()
-        
-        if not results:
-            console.print("\n[yellow]No transactions found matching the criteria.[/yellow]\n")
-            return
+        results = session.execute(query.limit(limit))
         
         # Display as table
-        table = Table(title=f"Transactions ({len(results)} results)")
+        table = Table()
         table.add_column("Date", style="cyan", width=12)
         table.add_column("Description", width=45)
         table.add_column("Amount", justify="right", style="green", width=12)
         table.add_column("Type", width=10)
         
+        # Cells are Text objects: styled directly, no markup to parse
+        # (nor to misread in descriptions containing brackets)
         total = 0
         for t in results:
+            total += t.amount
+            
             # Color negative amounts red
             amount_str = f"${t.amount:,.2f}"
             amount_style = "red" if t.amount < 0 else "green"
             
             table.add_row(
-                str(t.date),
-                t.description[:45],
-                f"[{amount_style}]{amount_str}[/{amount_style}]",
-                t.transaction_type
+                Text(str(t.date)),
+                Text(t.description[:45]),
+                Text(amount_str, style=amount_style),
+                Text(t.transaction_type)
             )
-            total += float(t.amount)
+        
+        if not table.row_count:
+            console.print("\n[yellow]No transactions found matching the criteria.[/yellow]\n")
+            return
+        
+        # Title and footer total of the rows shown, counted while adding them
+        table.title = f"Transactions ({table.row_count} results)"
+        total = float(total)
         
         console.print()
         console.print(table)
@@ -267,6 +765,11 @@ def transactions(month, category, min_amount, max_amount, limit):
         session.close()
 
 
+def _sum_if(condition):
+    """SQL sum of the transaction amounts matching a condition (0 if none)."""
+    return func.coalesce(func.sum(case((condition, Transaction.amount), else_=0)), 0)
+
+
 @cli.command()
 @click.option('--month', required=True, help='Month to summarize (YYYY-MM)')
 def summary(month):
@@ -281,36 +784,48 @@ def summary(month):
     try:
         # Parse month
         try:
-            year, month_num = month.split('-')
-            from datetime import date
-            start_date = date(int(year), int(month_num), 1)
-            if int(month_num) == 12:
-                end_date = date(int(year) + 1, 1, 1)
-            else:
-                end_date = date(int(year), int(month_num) + 1, 1)
+            start_date, end_date = _month_range(month)
         except ValueError:
             console.print("[red]Invalid month format. Use YYYY-MM[/red]")
             return
         
-        # Query transactions for the month
-        from sqlalchemy import func
-        transactions = session.query(Transaction).join(Statement).filter(
-            Transaction.date >= start_date,
-            Transaction.date < end_date
-        ).all()
+        # Month's sums by type and category, computed by the database in
+        # one scan; the handful of groups are combined here
+        groups = session.execute(select(
+            Transaction.transaction_type,
+            Transaction.category,
+            func.sum(Transaction.amount).label('total'),
+            _sum_if(Transaction.amount > 0).label('charges'),
+            _sum_if(Transaction.amount < 0).label('credits'),
+            # MSI payments this month
+            _sum_if(Transaction.is_installment_payment == True).label('msi')
+        ).join(Statement).where(
+            Transaction.date >= start_date, Transaction.date < end_date
+        ).group_by(Transaction.transaction_type, Transaction.category)).all()
         
-        if not transactions:
+        if not groups:
             console.print(f"\n[yellow]No transactions found for {month}[/yellow]\n")
             return
         
-        # Calculate summaries
-        total_income = sum(float(t.amount) for t in transactions if t.amount < 0 and t.transaction_type == 'payment')
-        total_expenses = sum(float(t.amount) for t in transactions if t.amount > 0 and t.transaction_type == 'expense')
-        total_interest = sum(float(t.amount) for t in transactions if t.transaction_type == 'interest')
-        total_fees = sum(float(t.amount) for t in transactions if t.transaction_type == 'fee')
+        total_income = total_expenses = total_interest = total_fees = msi_payments = 0
+        by_category = {}
+        for group in groups:
+            if group.transaction_type == 'payment':
+                total_income += group.credits
+            elif group.transaction_type == 'expense':
+                total_expenses += group.charges
+                # Categorized expenses, for the breakdown
+                if group.category:
+                    by_category[group.category] = group.total
+            elif group.transaction_type == 'interest':
+                total_interest += group.total
+            elif group.transaction_type == 'fee':
+                total_fees += group.total
+            msi_payments += group.msi
         
-        # MSI payments this month
-        msi_payments = sum(float(t.amount) for t in transactions if t.is_installment_payment)
+        total_income, total_expenses, total_interest, total_fees, msi_payments = (
+            float(total) for total in (total_income, total_expenses, total_interest, total_fees, msi_payments)
+        )
         
         # Display summary
         console.print(f"\n[bold blue]Financial Summary for {month}[/bold blue]\n")
@@ -330,21 +845,15 @@ def summary(month):
         console.print(summary_table)
         console.print()
         
-        # Category breakdown (if categorized)
-        categorized = [t for t in transactions if t.category and t.transaction_type == 'expense']
-        if categorized:
-            from collections import defaultdict
-            by_category = defaultdict(float)
-            for t in categorized:
-                by_category[t.category] += float(t.amount)
-            
+        # Category breakdown (if categorized), largest first
+        if by_category:
             console.print("[bold]Expenses by Category:[/bold]\n")
             cat_table = Table()
             cat_table.add_column("Category", style="cyan")
             cat_table.add_column("Amount", justify="right", style="green")
             
-            for cat in sorted(by_category.keys(), key=lambda x: by_category[x], reverse=True):
-                cat_table.add_row(cat.title(), f"${by_category[cat]:,.2f}")
+            for cat, amount in sorted(by_category.items(), key=lambda item: item[1], reverse=True):
+                cat_table.add_row(cat.title(), f"${float(amount):,.2f}")
             
             console.print(cat_table)
             console.print()
@@ -368,8 +877,16 @@ def msi(ending_soon, with_interest):
     session = get_session()
     
     try:
-        # Query active installment plans
-        query = session.query(InstallmentPlan).filter(
+        # Query active installment plans: only the displayed columns
+        query = session.query(
+            InstallmentPlan.description,
+            InstallmentPlan.current_installment,
+            InstallmentPlan.total_installments,
+            InstallmentPlan.monthly_payment,
+            InstallmentPlan.pending_balance,
+            InstallmentPlan.has_interest,
+            InstallmentPlan.end_date_calculated
+        ).filter(
             InstallmentPlan.status == 'active'
         )
         
@@ -384,7 +901,6 @@ def msi(ending_soon, with_interest):
         
         # Filter by ending soon
         if ending_soon:
-            from datetime import date, timedelta
             cutoff_date = date.today() + timedelta(days=ending_soon * 30)
             plans = [p for p in plans if p.end_date_calculated and p.end_date_calculated <= cutoff_date]
             
@@ -412,13 +928,14 @@ def msi(ending_soon, with_interest):
             interest_indicator = "✓" if plan.has_interest else "✗"
             interest_style = "red" if plan.has_interest else "green"
             
+            # Text cells: styled directly, no markup to parse
             table.add_row(
-                plan.description[:35],
-                progress,
-                f"${plan.monthly_payment:,.2f}",
-                f"${plan.pending_balance:,.2f}",
-                f"[{interest_style}]{interest_indicator}[/{interest_style}]",
-                str(plan.end_date_calculated) if plan.end_date_calculated else "N/A"
+                Text(plan.description[:35]),
+                Text(progress),
+                Text(f"${plan.monthly_payment:,.2f}"),
+                Text(f"${plan.pending_balance:,.2f}"),
+                Text(interest_indicator, style=interest_style),
+                Text(str(plan.end_date_calculated) if plan.end_date_calculated else "N/A")
             )
             
             total_pending += float(plan.pending_balance or 0)
@@ -443,7 +960,6 @@ def correct(limit):
     Reviews unclassified or low-confidence transactions and allows
     manual categorization. Corrections teach the system for future.
     """
-    from fin.cli_correct import correct_transactions
     correct_transactions(limit)
 
 
@@ -477,12 +993,13 @@ def subscriptions(months_back):
     
     for sub in subs:
         marker = "⭐" if sub['is_known_subscription'] else ""
+        # Text cells: styled by their column, no markup to parse
         table.add_row(
-            f"{marker} {sub['merchant_name']}",
-            f"${sub['average_amount']:,.2f}",
-            sub['frequency'],
-            str(sub['count']),
-            sub['last_payment'].strftime('%Y-%m-%d')
+            Text(f"{marker} {sub['merchant_name']}"),
+            Text(f"${sub['average_amount']:,.2f}"),
+            Text(sub['frequency']),
+            Text(str(sub['count'])),
+            Text(sub['last_payment'].strftime('%Y-%m-%d'))
         )
     
     console.print(table)
@@ -504,7 +1021,6 @@ def reports(month):
         generate_commitments_report,
         generate_merchant_profiles
     )
-    from pathlib import Path
     
     session = get_session()
     
@@ -543,7 +1059,6 @@ def reports(month):
         merchants_dir = Path("data/reports/merchants")
         merchants_dir.mkdir(parents=True, exist_ok=True)
         for merchant_name, profile_md in profiles:
-            import re
             safe_name = re.sub(r'[^\w\s-]', '', merchant_name).strip().replace(' ', '_')
             profile_file = merchants_dir / f"{safe_name}.md"
             profile_file.write_text(profile_md, encoding='utf-8')
@@ -751,9 +1266,7 @@ def chat(model, top_k):
         
         except Exception as e:
             console.print(f"\n[red]Error: {e}[/red]\n")
-            import traceback
-            if console.is_terminal:
-                traceback.print_exc()
+            logger.exception("Chat error")
 
 
 @cli.group()
@@ -762,6 +1275,36 @@ def export():
     pass
 
 
+@contextlib.contextmanager
+def _export_stream(output: Optional[str]):
+    """
+    Open the stream an export is written to: the output file, or stdout.
+    
+    A file is written under a temporary name next to it and only renamed
+    into place once complete, so a failed export leaves no partial file.
+    
+    Args:
+        output: Output file path (None for stdout)
+    """
+    if output:
+        temp_path = f"{output}.{os.getpid()}.tmp"
+        try:
+            # newline='': the csv module writes its own line endings
+            with open(temp_path, 'w', encoding='utf-8', newline='', buffering=EXPORT_BUFFER_SIZE) as f:
+                yield f
+            os.replace(temp_path, output)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            raise
+    else:
+        stdout = click.get_text_stream('stdout')
+        yield stdout
+        # Ends the output with a newline, as print() did
+        stdout.write('\n')
+        stdout.flush()
+
+
 @export.command('transactions')
 @click.option('--format', type=click.Choice(['csv', 'json']), default='csv', help='Output format')
 @click.option('--start-date', help='Start date (YYYY-MM-DD)')
@@ -779,9 +1322,6 @@ def export_transactions(format, start_date, end_date, category, bank, merchant,
       fin export transactions --category alimentacion --format json -o food.json
       fin export transactions --bank bbva --format csv > bbva.csv
     """
-    from fin.export import DataExporter
-    from datetime import datetime
-    
     session = get_session()
     exporter = DataExporter(session)
     
@@ -805,24 +1345,21 @@ def export_transactions(format, start_date, end_date, category, bank, merchant,
             session.close()
             return
     
-    # Export
+    # Export, written out as the rows are fetched
     try:
-        result = exporter.export_transactions(
-            format=format,
-            start_date=start_date_obj,
-            end_date=end_date_obj,
-            category=category,
-            bank=bank,
-            merchant=merchant
-        )
+        with _export_stream(output) as out:
+            exporter.write_transactions(
+                out,
+                format=format,
+                start_date=start_date_obj,
+                end_date=end_date_obj,
+                category=category,
+                bank=bank,
+                merchant=merchant
+            )
         
         if output:
-            with open(output, 'w', encoding='utf-8') as f:
-                f.write(result)
             console.print(f"[green]✓ Exported to {output}[/green]")
-        else:
-            # Output to stdout
-            print(result)
     
     except Exception as e:
         console.print(f"[red]Error exporting: {e}[/red]")
@@ -842,24 +1379,19 @@ def export_msi(format, status, output):
       fin export msi --format csv --status active
       fin export msi --format json --status all -o msi_all.json
     """
-    from fin.export import DataExporter
-    
     session = get_session()
     exporter = DataExporter(session)
     
     try:
-        result = exporter.export_msi(
-            format=format,
-            status=status
-        )
+        with _export_stream(output) as out:
+            exporter.write_msi(
+                out,
+                format=format,
+                status=status
+            )
         
         if output:
-            with open(output, 'w', encoding='utf-8') as f:
-                f.write(result)
             console.print(f"[green]✓ Exported to {output}[/green]")
-        else:
-            # Output to stdout
-            print(result)
     
     except Exception as e:
         console.print(f"[red]Error exporting: {e}[/red]")
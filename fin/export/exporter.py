@@ -2,14 +2,18 @@
 
 import csv
 import json
-from typing import List, Dict, Optional
+from typing import Iterable, Optional, TextIO
 from datetime import datetime, date
 from io import StringIO
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 
-from fin.models import Transaction, InstallmentPlan, Merchant
+from fin.models import Statement, Transaction, InstallmentPlan, Merchant
+
+
+# Rows fetched from the database per batch while exporting
+STREAM_BATCH_SIZE = 1000
 
 
 class DataExporter:
@@ -47,32 +51,72 @@ class DataExporter:
         Returns:
             Formatted string (CSV or JSON)
         """
-        # Build query
-        query = self.session.query(Transaction)
+        output = StringIO()
+        self.write_transactions(output, format, start_date, end_date, category, bank, merchant)
+        return output.getvalue()
+    
+    def write_transactions(
+        self,
+        output: TextIO,
+        format: str = 'csv',
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        category: Optional[str] = None,
+        bank: Optional[str] = None,
+        merchant: Optional[str] = None
+    ):
+        """
+        Write transactions with optional filters to a text stream.
+        
+        Rows are fetched in batches and written as they arrive, so memory
+        use does not grow with the number of transactions.
+        
+        Args:
+            output: Stream to write to (files opened with newline='')
+            format: 'csv' or 'json'
+            start_date: Filter from this date
+            end_date: Filter to this date
+            category: Filter by category
+            bank: Filter by bank
+            merchant: Filter by merchant name
+        """
+        if format not in ('csv', 'json'):
+            raise ValueError(f"Unsupported format: {format}")
+        
+        # Build query: the exported columns only, no ORM objects
+        query = select(
+            Transaction.date,
+            Transaction.description,
+            Transaction.amount,
+            Transaction.category,
+            Transaction.subcategory,
+            Transaction.transaction_type,
+            Transaction.installment_plan_id,
+            Merchant.id.label('merchant_id'),
+            Merchant.name.label('merchant_name'),
+            Statement.bank,
+            Statement.account_number
+        ).outerjoin(Transaction.statement).outerjoin(Transaction.merchant)
         
         if start_date:
-            query = query.filter(Transaction.date >= start_date)
+            query = query.where(Transaction.date >= start_date)
         if end_date:
-            query = query.filter(Transaction.date <= end_date)
+            query = query.where(Transaction.date <= end_date)
         if category:
-            query = query.filter(Transaction.category == category)
+            query = query.where(Transaction.category == category)
         if bank:
-            query = query.join(Transaction.statement).filter(
-                func.lower(Transaction.statement.bank).like(f"%{bank.lower()}%")
-            )
+            query = query.where(func.lower(Statement.bank).like(f"%{bank.lower()}%"))
         if merchant:
-            query = query.join(Transaction.merchant).filter(
-                func.lower(Merchant.name).like(f"%{merchant.lower()}%")
-            )
+            query = query.where(func.lower(Merchant.name).like(f"%{merchant.lower()}%"))
         
-        transactions = query.order_by(Transaction.date.desc()).all()
+        rows = self.session.execute(
+            query.order_by(Transaction.date.desc()).execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
         
         if format == 'csv':
-            return self._to_csv_transactions(transactions)
-        elif format == 'json':
-            return self._to_json_transactions(transactions)
+            self._write_csv_transactions(output, rows)
         else:
-            raise ValueError(f"Unsupported format: {format}")
+            self._write_json_transactions(output, rows)
     
     def export_msi(
         self,
@@ -89,23 +133,56 @@ class DataExporter:
         Returns:
             Formatted string (CSV or JSON)
         """
-        query = self.session.query(InstallmentPlan)
+        output = StringIO()
+        self.write_msi(output, format, status)
+        return output.getvalue()
+    
+    def write_msi(
+        self,
+        output: TextIO,
+        format: str = 'csv',
+        status: str = 'active'
+    ):
+        """
+        Write installment plans to a text stream, fetched in batches.
+        
+        Args:
+            output: Stream to write to (files opened with newline='')
+            format: 'csv' or 'json'
+            status: Filter by status ('active', 'completed', 'all')
+        """
+        if format not in ('csv', 'json'):
+            raise ValueError(f"Unsupported format: {format}")
+        
+        query = select(
+            InstallmentPlan.id,
+            InstallmentPlan.description,
+            InstallmentPlan.status,
+            InstallmentPlan.original_amount,
+            InstallmentPlan.monthly_payment,
+            InstallmentPlan.total_installments,
+            InstallmentPlan.current_installment,
+            InstallmentPlan.pending_balance,
+            InstallmentPlan.start_date,
+            InstallmentPlan.end_date_calculated,
+            InstallmentPlan.interest_rate,
+            Statement.bank
+        ).outerjoin(InstallmentPlan.statement)
         
         if status != 'all':
-            query = query.filter(InstallmentPlan.status == status)
+            query = query.where(InstallmentPlan.status == status)
         
-        plans = query.order_by(InstallmentPlan.start_date.desc()).all()
+        rows = self.session.execute(
+            query.order_by(InstallmentPlan.start_date.desc()).execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
         
         if format == 'csv':
-            return self._to_csv_msi(plans)
-        elif format == 'json':
-            return self._to_json_msi(plans)
+            self._write_csv_msi(output, rows)
         else:
-            raise ValueError(f"Unsupported format: {format}")
+            self._write_json_msi(output, rows)
     
-    def _to_csv_transactions(self, transactions: List[Transaction]) -> str:
-        """Convert transactions to CSV."""
-        output = StringIO()
+    def _write_csv_transactions(self, output: TextIO, rows: Iterable):
+        """Write transaction rows as CSV."""
         writer = csv.writer(output)
         
         # Header
@@ -122,45 +199,42 @@ class DataExporter:
         ])
         
         # Rows
-        for t in transactions:
-            writer.writerow([
+        writer.writerows(
+            [
                 t.date.isoformat() if t.date else '',
                 t.description or '',
                 float(t.amount) if t.amount else 0,
                 t.category or '',
                 t.subcategory or '',
-                t.merchant.name if t.merchant else '',
+                t.merchant_name or '',
                 t.transaction_type or '',
-                t.statement.bank if t.statement else '',
-                t.statement.card_last_4 if t.statement else ''
-            ])
-        
-        return output.getvalue()
+                t.bank or '',
+                t.account_number or ''
+            ]
+            for t in rows
+        )
     
-    def _to_json_transactions(self, transactions: List[Transaction]) -> str:
-        """Convert transactions to JSON."""
-        data = []
-        
-        for t in transactions:
-            data.append({
+    def _write_json_transactions(self, output: TextIO, rows: Iterable):
+        """Write transaction rows as JSON."""
+        _write_json_array(output, (
+            {
                 'date': t.date.isoformat() if t.date else None,
                 'description': t.description,
                 'amount': float(t.amount) if t.amount else 0,
                 'category': t.category,
                 'subcategory': t.subcategory,
-                'merchant': t.merchant.name if t.merchant else None,
-                'merchant_id': str(t.merchant.id) if t.merchant else None,
+                'merchant': t.merchant_name,
+                'merchant_id': str(t.merchant_id) if t.merchant_id else None,
                 'type': t.transaction_type,
-                'bank': t.statement.bank if t.statement else None,
-                'card_last_4': t.statement.card_last_4 if t.statement else None,
-                'installment_info': t.installment_info
-            })
-        
-        return json.dumps(data, indent=2, ensure_ascii=False)
+                'bank': t.bank,
+                'card_last_4': t.account_number,
+                'installment_plan_id': t.installment_plan_id
+            }
+            for t in rows
+        ))
     
-    def _to_csv_msi(self, plans: List[InstallmentPlan]) -> str:
-        """Convert MSI plans to CSV."""
-        output = StringIO()
+    def _write_csv_msi(self, output: TextIO, rows: Iterable):
+        """Write MSI plan rows as CSV."""
         writer = csv.writer(output)
         
         # Header
@@ -179,41 +253,55 @@ class DataExporter:
         ])
         
         # Rows
-        for p in plans:
-            writer.writerow([
+        writer.writerows(
+            [
                 p.description or '',
                 p.status or '',
                 float(p.original_amount) if p.original_amount else 0,
                 float(p.monthly_payment) if p.monthly_payment else 0,
                 p.total_installments or 0,
-                p.paid_installments or 0,
+                p.current_installment or 0,
                 float(p.pending_balance) if p.pending_balance else 0,
                 p.start_date.isoformat() if p.start_date else '',
                 p.end_date_calculated.isoformat() if p.end_date_calculated else '',
                 float(p.interest_rate) if p.interest_rate else 0,
-                p.statement.bank if p.statement else ''
-            ])
-        
-        return output.getvalue()
+                p.bank or ''
+            ]
+            for p in rows
+        )
     
-    def _to_json_msi(self, plans: List[InstallmentPlan]) -> str:
-        """Convert MSI plans to JSON."""
-        data = []
-        
-        for p in plans:
-            data.append({
+    def _write_json_msi(self, output: TextIO, rows: Iterable):
+        """Write MSI plan rows as JSON."""
+        _write_json_array(output, (
+            {
                 'id': str(p.id),
                 'description': p.description,
                 'status': p.status,
                 'original_amount': float(p.original_amount) if p.original_amount else 0,
                 'monthly_payment': float(p.monthly_payment) if p.monthly_payment else 0,
                 'total_installments': p.total_installments,
-                'paid_installments': p.paid_installments,
+                'paid_installments': p.current_installment,
                 'pending_balance': float(p.pending_balance) if p.pending_balance else 0,
                 'start_date': p.start_date.isoformat() if p.start_date else None,
                 'end_date_calculated': p.end_date_calculated.isoformat() if p.end_date_calculated else None,
                 'interest_rate': float(p.interest_rate) if p.interest_rate else None,
-                'bank': p.statement.bank if p.statement else None
-            })
-        
-        return json.dumps(data, indent=2, ensure_ascii=False)
+                'bank': p.bank
+            }
+            for p in rows
+        ))
+
+
+def _write_json_array(output: TextIO, items: Iterable[dict]):
+    """
+    Write items as a JSON array one item at a time.
+    
+    The layout matches json.dumps(list(items), indent=2) without building
+    the list (strings are escaped, so re-indenting by newline is safe).
+    """
+    output.write('[')
+    first = True
+    for item in items:
+        output.write('\n  ' if first else ',\n  ')
+        output.write(json.dumps(item, indent=2, ensure_ascii=False).replace('\n', '\n  '))
+        first = False
+    output.write(']' if first else '\n]')
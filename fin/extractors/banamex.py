@@ -1,6 +1,7 @@
 """Banamex bank statement extractor."""
 
-from .base import BaseExtractor
+from .base import BaseExtractor, PageTexts, compile_line_pattern
+from typing import Optional
 from fin.models import Statement, Transaction, InstallmentPlan
 from fin.utils import (
     parse_spanish_date,
@@ -11,6 +12,29 @@ import re
 from decimal import Decimal
 from datetime import datetime
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Summary patterns
+PERIOD_RE = re.compile(r'Periodo:\s*(\d{1,2}-[a-z]{3}-\d{4})\s+al\s+(\d{1,2}-[a-z]{3}-\d{4})', re.IGNORECASE)
+CORTE_RE = re.compile(r'Fecha\s+de\s+corte:\s*(\d{1,2}-[a-z]{3}-\d{4})', re.IGNORECASE)
+NO_INTEREST_RE = re.compile(r'pago\s+para\s+no\s+generar\s+intereses\s*\$?\s*([0-9,]+\.\d{2})', re.IGNORECASE)
+MIN_PAYMENT_RE = re.compile(r'Pago\s+mínimo:\s*\$?\s*([0-9,]+\.\d{2})', re.IGNORECASE)
+ACCOUNT_RE = re.compile(r'Número\s+de\s+tarjeta:?\s*[\d\s]*(\d{4})', re.IGNORECASE)
+
+# Line patterns
+# Format: 21-nov-2025 DESCRIPTION $ORIGINAL $PENDING $PAYMENT X de Y
+MSI_RE = compile_line_pattern(
+    r'(\d{1,2}-[a-z]{3}-\d{4})\s+(.+?)\s+\$\s*([0-9,]+\.\d{2})\s+\$\s*([0-9,]+\.\d{2})\s+\$\s*([0-9,]+\.\d{2})\s+(\d+)\s+de\s+(\d+)',
+    re.IGNORECASE
+)
+# Format: DD-MMM-YYYY DESCRIPTION $AMOUNT
+TRANS_RE = compile_line_pattern(
+    r'(\d{1,2}-[a-z]{3}-\d{4})\s+(.+?)\s+[\+\-]?\s*\$\s*([0-9,]+\.\d{2})',
+    re.IGNORECASE
+)
 
 
 class BanamexExtractor(BaseExtractor):
@@ -20,26 +44,23 @@ class BanamexExtractor(BaseExtractor):
     def bank_name(self) -> str:
         return "banamex"
     
-    def can_parse(self, file_path: str) -> bool:
+    def can_parse(self, file_path: str, page_texts: Optional[PageTexts] = None) -> bool:
         """Check if file is a Banamex statement."""
         try:
-            with self._open_pdf(file_path) as pdf:
-                # Check first page for Banamex identifier
-                first_page = self._extract_text_from_page(pdf.pages[0])
-                # Banamex doesn't always say "BANAMEX" explicitly, look for unique patterns
-                return ('BANAMEX' in first_page.upper() or 
-                        'Número de tarjeta' in first_page and 'Estado de Cuenta Mensual' in first_page)
+            # Check first page for Banamex identifier
+            first_page = next(self._iter_page_texts(file_path, pages=[1], page_texts=page_texts), "")
+            # Banamex doesn't always say "BANAMEX" explicitly, look for unique patterns
+            return ('BANAMEX' in first_page.upper() or 
+                    'Número de tarjeta' in first_page and 'Estado de Cuenta Mensual' in first_page)
         except Exception:
             return False
     
-    def parse(self, file_path: str):
+    def parse(self, file_path: str, data: Optional[bytes] = None):
         """Parse Banamex statement."""
         try:
-            with self._open_pdf(file_path) as pdf:
+            with self._open_pdf(file_path, data=data) as pdf:
                 # Extract full text
-                full_text = ""
-                for page in pdf.pages:
-                    full_text += self._extract_text_from_page(page) + "\n"
+                full_text = self._extract_full_text(pdf)
                 
                 # Create statement
                 statement = Statement()
@@ -61,10 +82,8 @@ class BanamexExtractor(BaseExtractor):
                 
                 return statement, transactions, installment_plans
                 
-        except Exception as e:
-            print(f"Error parsing Banamex statement: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error parsing Banamex statement")
             return None, [], []
     
     def _extract_summary(self, text: str, statement: Statement):
@@ -72,30 +91,30 @@ class BanamexExtractor(BaseExtractor):
         
         # Extract period dates
         # Format: "Periodo: 21-nov-2025 al 19-dic-2025"
-        period_match = re.search(r'Periodo:\s*(\d{1,2}-[a-z]{3}-\d{4})\s+al\s+(\d{1,2}-[a-z]{3}-\d{4})', text, re.IGNORECASE)
+        period_match = PERIOD_RE.search(text)
         if period_match:
             statement.period_start = parse_spanish_date(period_match.group(1))
             statement.period_end = parse_spanish_date(period_match.group(2))
         
         # Extract statement date (fecha de corte)
-        corte_match = re.search(r'Fecha\s+de\s+corte:\s*(\d{1,2}-[a-z]{3}-\d{4})', text, re.IGNORECASE)
+        corte_match = CORTE_RE.search(text)
         if corte_match:
             statement.statement_date = parse_spanish_date(corte_match.group(1))
         
         # Extract payment amounts
         # "El pago para no generar intereses $20,607.70"
-        no_interest_match = re.search(r'pago\s+para\s+no\s+generar\s+intereses\s*\$?\s*([0-9,]+\.\d{2})', text, re.IGNORECASE)
+        no_interest_match = NO_INTEREST_RE.search(text)
         if no_interest_match:
             statement.payment_no_interest = parse_amount(no_interest_match.group(1))
         
         # "Pago mínimo: $1,250.00"
-        min_payment_match = re.search(r'Pago\s+mínimo:\s*\$?\s*([0-9,]+\.\d{2})', text, re.IGNORECASE)
+        min_payment_match = MIN_PAYMENT_RE.search(text)
         if min_payment_match:
             statement.minimum_payment = parse_amount(min_payment_match.group(1))
         
         # Extract account number (Número de tarjeta)
         # Format varies, try to get last 4 digits
-        account_match = re.search(r'Número\s+de\s+tarjeta:?\s*[\d\s]*(\d{4})', text, re.IGNORECASE)
+        account_match = ACCOUNT_RE.search(text)
         if account_match:
             statement.account_number = account_match.group(1)
     
@@ -107,77 +126,63 @@ class BanamexExtractor(BaseExtractor):
         transactions = []
         installment_plans = []
         
-        lines = text.split('\n')
+        # Lines that matched the MSI pattern take precedence over the
+        # regular transaction pattern
+        msi_lines = set()
+        
+        for msi_match in MSI_RE.finditer(text):
+            msi_lines.add(msi_match.start())
+            
+            plan = InstallmentPlan()
+            plan.statement_id = statement.id
+            plan.start_date = parse_spanish_date(msi_match.group(1))
+            plan.description = msi_match.group(2).strip()
+            plan.original_amount = parse_amount(msi_match.group(3))
+            plan.pending_balance = parse_amount(msi_match.group(4))
+            plan.monthly_payment = parse_amount(msi_match.group(5))
+            plan.current_installment = int(msi_match.group(6))
+            plan.total_installments = int(msi_match.group(7))
+            plan.has_interest = False  # Assume no interest unless detected
+            plan.source_bank = self.bank_name
+            plan.plan_type = 'msi'
+            plan.status = 'active'
+            
+            # Calculate end date
+            plan.calculate_end_date()
+            
+            installment_plans.append(plan)
         
-        for line in lines:
-            line = line.strip()
-            if not line:
+        # Regular transaction pattern (no "X de Y")
+        for trans_match in TRANS_RE.finditer(text):
+            if trans_match.start() in msi_lines:
                 continue
             
-            # Try to match MSI pattern first (has "X de Y")
-            # Format: 21-nov-2025 DESCRIPTION $ORIGINAL $PENDING $PAYMENT X de Y
-            msi_match = re.match(
-                r'(\d{1,2}-[a-z]{3}-\d{4})\s+(.+?)\s+\$\s*([0-9,]+\.\d{2})\s+\$\s*([0-9,]+\.\d{2})\s+\$\s*([0-9,]+\.\d{2})\s+(\d+)\s+de\s+(\d+)',
-                line,
-                re.IGNORECASE
-            )
+            description = trans_match.group(2).strip()
+            desc_upper = description.upper()
             
-            if msi_match:
-                plan = InstallmentPlan()
-                plan.statement_id = statement.id
-                plan.start_date = parse_spanish_date(msi_match.group(1))
-                plan.description = msi_match.group(2).strip()
-                plan.original_amount = parse_amount(msi_match.group(3))
-                plan.pending_balance = parse_amount(msi_match.group(4))
-                plan.monthly_payment = parse_amount(msi_match.group(5))
-                plan.current_installment = int(msi_match.group(6))
-                plan.total_installments = int(msi_match.group(7))
-                plan.has_interest = False  # Assume no interest unless detected
-                plan.source_bank = self.bank_name
-                plan.plan_type = 'msi'
-                plan.status = 'active'
-                
-                # Calculate end date
-                plan.calculate_end_date()
-                
-                installment_plans.append(plan)
+            # Skip if it looks like header or summary line
+            if any(keyword in desc_upper for keyword in ['ORDINARIOS', 'MORATORIOS', 'SALDO', 'TOTAL']):
                 continue
             
-            # Try regular transaction pattern (no "X de Y")
-            # Format: DD-MMM-YYYY DESCRIPTION $AMOUNT
-            trans_match = re.match(
-                r'(\d{1,2}-[a-z]{3}-\d{4})\s+(.+?)\s+[\+\-]?\s*\$\s*([0-9,]+\.\d{2})',
-                line,
-                re.IGNORECASE
-            )
+            trans = Transaction()
+            trans.statement_id = statement.id
+            trans.date = parse_spanish_date(trans_match.group(1))
+            trans.description = description
+            trans.description_normalized = normalize_description(description)
+            trans.amount = parse_amount(trans_match.group(3))
             
-            if trans_match:
-                description = trans_match.group(2).strip()
-                
-                # Skip if it looks like header or summary line
-                if any(keyword in description.upper() for keyword in ['ORDINARIOS', 'MORATORIOS', 'SALDO', 'TOTAL']):
-                    continue
-                
-                trans = Transaction()
-                trans.statement_id = statement.id
-                trans.date = parse_spanish_date(trans_match.group(1))
-                trans.description = description
-                trans.description_normalized = normalize_description(description)
-                trans.amount = parse_amount(trans_match.group(3))
-                
-                # Determine transaction type
-                desc_upper = description.upper()
-                if 'PAGO' in desc_upper:
-                    trans.transaction_type = 'payment'
-                    trans.amount = -trans.amount  # Payments are negative
-                elif 'INTERES' in desc_upper:
-                    trans.transaction_type = 'interest'
-                    trans.has_interest = True
-                elif 'COMISION' in desc_upper or 'ANUALIDAD' in desc_upper:
-                    trans.transaction_type = 'fee'
-                else:
-                    trans.transaction_type = 'expense'
-                
-                transactions.append(trans)
+            # Determine transaction type
+            if 'PAGO' in desc_upper:
+                trans.transaction_type = 'payment'
+                trans.amount = -trans.amount  # Payments are negative
+            elif 'INTERES' in desc_upper:
+                trans.transaction_type = 'interest'
+                trans.has_interest = True
+            elif 'COMISION' in desc_upper or 'ANUALIDAD' in desc_upper:
+                trans.transaction_type = 'fee'
+            else:
+                trans.transaction_type = 'expense'
+            
+            transactions.append(trans)
         
         return transactions, installment_plans
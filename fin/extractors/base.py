@@ -1,8 +1,115 @@
 """Base extractor class for bank statement parsers."""
 
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Iterator, Optional
+import io
+import itertools
 import pdfplumber
+import re
+
+# PyMuPDF (optional) for fast plain-text sniffing during bank detection
+try:
+    import pymupdf
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+
+def compile_line_pattern(pattern: str, flags: int = 0):
+    """
+    Compile a single-line pattern for scanning a whole text with finditer.
+    
+    The pattern is anchored at the start of each line (leading blanks
+    allowed) and its whitespace classes are kept from crossing line
+    breaks, so one finditer pass over the text matches exactly what
+    re.match would on each stripped line. Whitespace escapes must not
+    appear inside a character class.
+    
+    Args:
+        pattern: Regex written for a single stripped line
+        flags: Extra regex flags
+        
+    Returns:
+        Compiled pattern (with re.MULTILINE)
+    """
+    pattern = pattern.replace(r'\s', r'[^\S\n]')
+    return re.compile(r'^[^\S\n]*' + pattern, flags | re.MULTILINE)
+
+
+def iter_page_texts(file_path: str, pages: Optional[list] = None, data: Optional[bytes] = None) -> Iterator[str]:
+    """
+    Read plain page text for bank detection.
+    
+    Uses PyMuPDF when installed (much faster than pdfplumber's layout
+    analysis) and falls back to pdfplumber. Only meant for identifier
+    checks; parsing keeps pdfplumber, whose line layout the extractor
+    patterns rely on.
+    
+    Args:
+        file_path: Path to PDF file
+        pages: 1-based page numbers to read (default: all pages)
+        data: Content of the file, if already in memory
+        
+    Yields:
+        Text content of each page
+    """
+    if PYMUPDF_AVAILABLE:
+        with (pymupdf.open(stream=data) if data is not None else pymupdf.open(file_path)) as doc:
+            numbers = pages or range(1, doc.page_count + 1)
+            for number in numbers:
+                if number > doc.page_count:
+                    break
+                # sort: visual (reading) order, like pdfplumber, not content
+                # stream order, so identifiers drawn in pieces are rebuilt
+                yield doc[number - 1].get_text(sort=True)
+    else:
+        with pdfplumber.open(io.BytesIO(data) if data is not None else file_path, pages=pages) as pdf:
+            for page in pdf.pages:
+                text = page.extract_text() or ""
+                page.close()
+                yield text
+
+
+class PageTexts:
+    """
+    Detection text of one PDF, shared by every extractor's can_parse.
+    
+    The document is opened once and pages are read in order only as far
+    as some extractor asks for them.
+    """
+    
+    def __init__(self, file_path: str, data: Optional[bytes] = None):
+        """
+        Args:
+            file_path: Path to PDF file
+            data: Content of the file, if already in memory
+        """
+        self._reader = iter_page_texts(file_path, data=data)
+        self._texts = []
+    
+    def pages(self, numbers: Optional[list] = None) -> Iterator[str]:
+        """
+        Get the text of some pages.
+        
+        Args:
+            numbers: 1-based page numbers (default: all pages)
+            
+        Yields:
+            Text content of each existing page
+        """
+        if numbers is None:
+            numbers = itertools.count(1)
+        for number in numbers:
+            while len(self._texts) < number:
+                text = next(self._reader, None)
+                if text is None:
+                    return
+                self._texts.append(text)
+            yield self._texts[number - 1]
+    
+    def close(self):
+        """Close the document if it is still open."""
+        self._reader.close()
 
 
 class BaseExtractor(ABC):
@@ -15,12 +122,13 @@ class BaseExtractor(ABC):
         pass
     
     @abstractmethod
-    def can_parse(self, file_path: str) -> bool:
+    def can_parse(self, file_path: str, page_texts: Optional[PageTexts] = None) -> bool:
         """
         Determine if this extractor can parse the given file.
         
         Args:
             file_path: Path to the PDF file
+            page_texts: Text already read by the detector (read here if None)
             
         Returns:
             True if this extractor can handle the file
@@ -28,29 +136,35 @@ class BaseExtractor(ABC):
         pass
     
     @abstractmethod
-    def parse(self, file_path: str):
+    def parse(self, file_path: str, data: Optional[bytes] = None):
         """
         Parse the bank statement and return a Statement object.
         
         Args:
             file_path: Path to the PDF file
+            data: Content of the file, if already in memory (saves
+                reading it again)
             
         Returns:
             Statement object or None if parsing fails
         """
         pass
     
-    def _open_pdf(self, file_path: str):
+    def _open_pdf(self, file_path: str, pages: Optional[list] = None, data: Optional[bytes] = None):
         """
         Helper method to open PDF file.
         
         Args:
             file_path: Path to PDF file
+            pages: 1-based page numbers to load (default: all pages)
+            data: Content of the file, if already in memory
             
         Returns:
             pdfplumber.PDF object
         """
-        return pdfplumber.open(file_path)
+        if data is not None:
+            return pdfplumber.open(io.BytesIO(data), pages=pages)
+        return pdfplumber.open(file_path, pages=pages)
     
     def _extract_text_from_page(self, page) -> str:
         """
@@ -62,7 +176,48 @@ class BaseExtractor(ABC):
         Returns:
             Text content
         """
-        return page.extract_text() or ""
+        text = page.extract_text() or ""
+        # Pages are read once; drop pdfminer's cached layout objects
+        page.close()
+        return text
+    
+    def _iter_page_texts(
+        self,
+        file_path: str,
+        pages: Optional[list] = None,
+        page_texts: Optional[PageTexts] = None
+    ) -> Iterator[str]:
+        """
+        Helper method to read plain page text for bank detection.
+        
+        Args:
+            file_path: Path to PDF file
+            pages: 1-based page numbers to read (default: all pages)
+            page_texts: Text shared by the detector; the file is only
+                opened when this is None
+            
+        Yields:
+            Text content of each page
+        """
+        if page_texts is not None:
+            return page_texts.pages(pages)
+        return iter_page_texts(file_path, pages)
+    
+    def _extract_full_text(self, pdf) -> str:
+        """
+        Helper method to extract the text of every page.
+        
+        Args:
+            pdf: pdfplumber.PDF object
+            
+        Returns:
+            Text of all pages, each followed by a newline
+        """
+        parts = []
+        for page in pdf.pages:
+            parts.append(self._extract_text_from_page(page))
+            parts.append("\n")
+        return "".join(parts)
     
     def _find_text_in_pdf(self, pdf, search_text: str) -> bool:
         """
@@ -75,8 +230,9 @@ class BaseExtractor(ABC):
         Returns:
             True if text is found
         """
+        search_upper = search_text.upper()
         for page in pdf.pages:
             text = self._extract_text_from_page(page)
-            if search_text.upper() in text.upper():
+            if search_upper in text.upper():
                 return True
         return False
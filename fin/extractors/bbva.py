@@ -1,6 +1,7 @@
 """Improved BBVA bank statement extractor based on real PDF format."""
 
-from .base import BaseExtractor
+from .base import BaseExtractor, PageTexts
+from typing import Optional
 from fin.models import Statement, Transaction, InstallmentPlan
 from fin.utils import (
     parse_spanish_date,
@@ -14,6 +15,9 @@ import re
 from decimal import Decimal
 from datetime import datetime
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class BBVAExtractor(BaseExtractor):
@@ -23,22 +27,19 @@ class BBVAExtractor(BaseExtractor):
     def bank_name(self) -> str:
         return "bbva"
     
-    def can_parse(self, file_path: str) -> bool:
+    def can_parse(self, file_path: str, page_texts: Optional[PageTexts] = None) -> bool:
         """Check if file is a BBVA statement."""
         try:
-            with self._open_pdf(file_path) as pdf:
-                return self._find_text_in_pdf(pdf, "BBVA")
+            return any('BBVA' in text.upper() for text in self._iter_page_texts(file_path, page_texts=page_texts))
         except Exception:
             return False
     
-    def parse(self, file_path: str):
+    def parse(self, file_path: str, data: Optional[bytes] = None):
         """Parse BBVA statement."""
         try:
-            with self._open_pdf(file_path) as pdf:
+            with self._open_pdf(file_path, data=data) as pdf:
                 # Extract full text for easier parsing
-                full_text = ""
-                for page in pdf.pages:
-                    full_text += self._extract_text_from_page(page) + "\n"
+                full_text = self._extract_full_text(pdf)
                 
                 # Create statement object
                 statement = Statement()
@@ -66,10 +67,8 @@ class BBVAExtractor(BaseExtractor):
                 
                 return statement, transactions, installment_plans
                 
-        except Exception as e:
-            print(f"Error parsing BBVA statement: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error parsing BBVA statement")
             return None, [], []
     
     def _extract_summary(self, text: str, statement: Statement):
@@ -146,9 +145,10 @@ class BBVAExtractor(BaseExtractor):
                 description = trans_match.group(3).strip()
                 sign = trans_match.group(4)
                 amount_str = trans_match.group(5)
+                desc_upper = description.upper()
                 
                 # Skip lines that are details (IVA, Interes, etc.)
-                if any(keyword in description.upper() for keyword in ['IVA :', 'INTERES:', 'COMISIONES:', 'CAPITAL:', 'PAGO EXCEDENTE:']):
+                if any(keyword in desc_upper for keyword in ['IVA :', 'INTERES:', 'COMISIONES:', 'CAPITAL:', 'PAGO EXCEDENTE:']):
                     continue
                 
                 # Create transaction
@@ -164,7 +164,6 @@ class BBVAExtractor(BaseExtractor):
                 trans.amount = -amount if sign == '-' else amount
                 
                 # Determine transaction type
-                desc_upper = description.upper()
                 if 'PAGO' in desc_upper:
                     trans.transaction_type = 'payment'
                 elif 'INTERES' in desc_upper:
@@ -5,6 +5,7 @@ from .hsbc import HSBCExtractor
 from .banamex import BanamexExtractor
 from .banorte import BanorteExtractor
 from .liverpool import LiverpoolCreditExtractor, LiverpoolDebitExtractor
+from .base import PageTexts
 from typing import Optional
 
 
@@ -22,19 +23,25 @@ class BankDetector:
             BBVAExtractor(),
         ]
     
-    def detect(self, file_path: str) -> Optional:
+    def detect(self, file_path: str, data: Optional[bytes] = None) -> Optional:
         """
         Detect which extractor can parse the given file.
         
         Args:
             file_path: Path to the PDF file
+            data: Content of the file, if already in memory
             
         Returns:
             Appropriate extractor instance or None
         """
-        for extractor in self.extractors:
-            if extractor.can_parse(file_path):
-                return extractor
+        # Every extractor checks the same text; read it from one open document
+        page_texts = PageTexts(file_path, data)
+        try:
+            for extractor in self.extractors:
+                if extractor.can_parse(file_path, page_texts):
+                    return extractor
+        finally:
+            page_texts.close()
         
         return None
     
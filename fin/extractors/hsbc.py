@@ -1,6 +1,7 @@
 """HSBC bank statement extractor."""
 
-from .base import BaseExtractor
+from .base import BaseExtractor, PageTexts
+from typing import Optional
 from fin.models import Statement, Transaction, InstallmentPlan
 from fin.utils import (
     parse_spanish_date,
@@ -11,6 +12,9 @@ import re
 from decimal import Decimal
 from datetime import datetime
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class HSBCExtractor(BaseExtractor):
@@ -20,27 +24,24 @@ class HSBCExtractor(BaseExtractor):
     def bank_name(self) -> str:
         return "hsbc"
     
-    def can_parse(self, file_path: str) -> bool:
+    def can_parse(self, file_path: str, page_texts: Optional[PageTexts] = None) -> bool:
         """Check if file is an HSBC statement."""
         try:
-            with self._open_pdf(file_path) as pdf:
-                # HSBC identifier appears on page 2, so check first 2 pages
-                for i in range(min(2, len(pdf.pages))):
-                    text = self._extract_text_from_page(pdf.pages[i])
-                    if 'HSBC AIR' in text.upper() or 'HSBC MEXICO' in text.upper():
-                        return True
-                return False
+            # HSBC identifier appears on page 2, so check first 2 pages
+            for text in self._iter_page_texts(file_path, pages=[1, 2], page_texts=page_texts):
+                text_upper = text.upper()
+                if 'HSBC AIR' in text_upper or 'HSBC MEXICO' in text_upper:
+                    return True
+            return False
         except Exception:
             return False
     
-    def parse(self, file_path: str):
+    def parse(self, file_path: str, data: Optional[bytes] = None):
         """Parse HSBC statement."""
         try:
-            with self._open_pdf(file_path) as pdf:
+            with self._open_pdf(file_path, data=data) as pdf:
                 # Extract full text
-                full_text = ""
-                for page in pdf.pages:
-                    full_text += self._extract_text_from_page(page) + "\n"
+                full_text = self._extract_full_text(pdf)
                 
                 # Create statement
                 statement = Statement()
@@ -67,10 +68,8 @@ class HSBCExtractor(BaseExtractor):
                 
                 return statement, transactions, installment_plans
                 
-        except Exception as e:
-            print(f"Error parsing HSBC statement: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error parsing HSBC statement")
             return None, [], []
     
     def _extract_summary(self, text: str, statement: Statement):
@@ -1,6 +1,7 @@
 """Liverpool bank statement extractor with OCR support."""
 
-from .base import BaseExtractor
+from .base import BaseExtractor, PageTexts
+from typing import Optional
 from fin.models import Statement, Transaction, InstallmentPlan
 from fin.utils import (
     parse_spanish_date,
@@ -11,6 +12,7 @@ import re
 from decimal import Decimal
 from datetime import datetime
 import json
+import logging
 
 # OCR imports (optional)
 try:
@@ -21,6 +23,32 @@ try:
 except ImportError:
     OCR_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+
+# Summary patterns, in order of preference
+PERIOD_PATTERNS = [
+    re.compile(r'Periodo:?\s*(\d{2}/\d{2}/\d{4})\s*(?:al|a)\s*(\d{2}/\d{2}/\d{4})', re.I),
+    re.compile(r'Del\s+(\d{2}/\d{2}/\d{4})\s+al\s+(\d{2}/\d{2}/\d{4})', re.I),
+]
+# Each named group is the Statement field the amount belongs to
+PAYMENT_RE = re.compile(
+    r'[Pp]ago\s+(?:'
+    r'(?:mínimo|minimo)[:\s]*\$?\s*(?P<minimum_payment>[0-9,]+\.?\d*)'
+    r'|(?:total|para\s+no\s+generar)[:\s]*\$?\s*(?P<payment_no_interest>[0-9,]+\.?\d*)'
+    r')',
+    re.I
+)
+ACCOUNT_PATTERNS = [
+    re.compile(r'[Tt]arjeta[:\s]*[\*\d\s]*(\d{4})'),
+    re.compile(r'[Cc]uenta[:\s]*[\*\d\s]*(\d{4})'),
+]
+# Line patterns, matched against every line of the OCR text
+# Transaction: DD/MM/YYYY DESCRIPTION $AMOUNT
+TRANSACTION_RE = re.compile(r'(\d{2}/\d{2}/\d{4})\s+(.+?)\s+\$?\s*([0-9,]+\.?\d*)', re.IGNORECASE)
+# MSI: DESCRIPTION X de Y MESES $PAYMENT
+MSI_RE = re.compile(r'(.+?)\s+(\d+)\s+de\s+(\d+)\s+(?:MESES|meses)\s+\$?\s*([0-9,]+\.?\d*)', re.IGNORECASE)
+
 
 class LiverpoolCreditExtractor(BaseExtractor):
     """Extractor for Liverpool credit card statements using OCR."""
@@ -29,28 +57,29 @@ class LiverpoolCreditExtractor(BaseExtractor):
     def bank_name(self) -> str:
         return "liverpool_credit"
     
-    def can_parse(self, file_path: str) -> bool:
+    def can_parse(self, file_path: str, page_texts: Optional[PageTexts] = None) -> bool:
         """Check if file is a Liverpool credit card statement."""
         try:
             # Try standard text extraction first
-            with self._open_pdf(file_path) as pdf:
-                for i in range(min(2, len(pdf.pages))):
-                    text = self._extract_text_from_page(pdf.pages[i])
-                    if 'LIVERPOOL' in text.upper() and 'CREDITO' in text.upper():
-                        return True
+            for text in self._iter_page_texts(file_path, pages=[1, 2], page_texts=page_texts):
+                text_upper = text.upper()
+                if 'LIVERPOOL' in text_upper and 'CREDITO' in text_upper:
+                    return True
             
             # If standard extraction fails, try OCR on first page
             if OCR_AVAILABLE:
                 ocr_text = self._ocr_extract_text(file_path, pages=[0])
-                if 'LIVERPOOL' in ocr_text.upper() or 'FABRICAS' in ocr_text.upper():
+                ocr_upper = ocr_text.upper()
+                if 'LIVERPOOL' in ocr_upper or 'FABRICAS' in ocr_upper:
                     return True
             
             return False
         except Exception:
             return False
     
-    def parse(self, file_path: str):
+    def parse(self, file_path: str, data: Optional[bytes] = None):
         """Parse Liverpool credit statement using OCR - Extract 100% of data."""
+        # data is unused: poppler renders the pages from the file itself
         if not OCR_AVAILABLE:
             raise ImportError(
                 "OCR dependencies not installed. Run: "
@@ -86,10 +115,8 @@ class LiverpoolCreditExtractor(BaseExtractor):
             
             return statement, transactions, installment_plans
             
-        except Exception as e:
-            print(f"Error parsing Liverpool credit statement: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error parsing Liverpool credit statement")
             return None, [], []
     
     def _ocr_extract_text(self, file_path: str, pages: list = None) -> str:
@@ -102,14 +129,14 @@ class LiverpoolCreditExtractor(BaseExtractor):
                 images = convert_from_path(file_path)
             
             # Extract text from each image
-            full_text = ""
+            parts = []
             for i, image in enumerate(images):
                 # Use Spanish language for better accuracy
                 text = pytesseract.image_to_string(image, lang='spa+eng')
-                full_text += f"\n--- PAGE {i+1} ---\n"
-                full_text += text
+                parts.append(f"\n--- PAGE {i+1} ---\n")
+                parts.append(text)
             
-            return full_text
+            return "".join(parts)
         except Exception as e:
             print(f"OCR extraction error: {e}")
             return ""
@@ -118,12 +145,8 @@ class LiverpoolCreditExtractor(BaseExtractor):
         """Extract summary from Liverpool statement."""
         
         # Period dates - Liverpool might use DD/MM/YYYY format
-        period_patterns = [
-            r'Periodo:?\s*(\d{2}/\d{2}/\d{4})\s*(?:al|a)\s*(\d{2}/\d{2}/\d{4})',
-            r'Del\s+(\d{2}/\d{2}/\d{4})\s+al\s+(\d{2}/\d{2}/\d{4})',
-        ]
-        for pattern in period_patterns:
-            match = re.search(pattern, text, re.I)
+        for pattern in PERIOD_PATTERNS:
+            match = pattern.search(text)
             if match:
                 # Convert DD/MM/YYYY to date
                 try:
@@ -134,27 +157,24 @@ class LiverpoolCreditExtractor(BaseExtractor):
                 except:
                     pass
         
-        # Payment amounts
-        payment_patterns = [
-            (r'[Pp]ago\s+(?:mínimo|minimo)[:\s]*\$?\s*([0-9,]+\.?\d*)', 'minimum_payment'),
-            (r'[Pp]ago\s+(?:total|para\s+no\s+generar)[:\s]*\$?\s*([0-9,]+\.?\d*)', 'payment_no_interest'),
-        ]
-        for pattern, field in payment_patterns:
-            match = re.search(pattern, text, re.I)
-            if match:
-                try:
-                    amount = parse_amount(match.group(1))
-                    setattr(statement, field, amount)
-                except:
-                    pass
+        # Payment amounts - first occurrence of each field, in one pass
+        seen_fields = set()
+        for match in PAYMENT_RE.finditer(text):
+            field = match.lastgroup
+            if field in seen_fields:
+                continue
+            seen_fields.add(field)
+            try:
+                amount = parse_amount(match.group(field))
+                setattr(statement, field, amount)
+            except:
+                pass
+            if len(seen_fields) == len(PAYMENT_RE.groupindex):
+                break
         
         # Account number (last 4 digits)
-        account_patterns = [
-            r'[Tt]arjeta[:\s]*[\*\d\s]*(\d{4})',
-            r'[Cc]uenta[:\s]*[\*\d\s]*(\d{4})',
-        ]
-        for pattern in account_patterns:
-            match = re.search(pattern, text)
+        for pattern in ACCOUNT_PATTERNS:
+            match = pattern.search(text)
             if match:
                 statement.account_number = match.group(1)
                 break
@@ -171,20 +191,16 @@ class LiverpoolCreditExtractor(BaseExtractor):
                 continue
             
             # Liverpool transaction pattern (DD/MM/YYYY format assumed)
-            # Pattern: DD/MM/YYYY DESCRIPTION $AMOUNT
-            trans_match = re.match(
-                r'(\d{2}/\d{2}/\d{4})\s+(.+?)\s+\$?\s*([0-9,]+\.?\d*)',
-                line,
-                re.IGNORECASE
-            )
+            trans_match = TRANSACTION_RE.match(line)
             
             if trans_match:
                 date_str = trans_match.group(1)
                 description = trans_match.group(2).strip()
                 amount_str = trans_match.group(3)
+                desc_upper = description.upper()
                 
                 # Skip headers
-                if any(kw in description.upper() for kw in ['FECHA', 'DESCRIPCION', 'TOTAL', 'SALDO']):
+                if any(kw in desc_upper for kw in ['FECHA', 'DESCRIPCION', 'TOTAL', 'SALDO']):
                     continue
                 
                 try:
@@ -196,7 +212,6 @@ class LiverpoolCreditExtractor(BaseExtractor):
                     trans.amount = parse_amount(amount_str)
                     
                     # Determine type
-                    desc_upper = description.upper()
                     if 'PAGO' in desc_upper:
                         trans.transaction_type = 'payment'
                         trans.amount = -trans.amount
@@ -222,12 +237,8 @@ class LiverpoolCreditExtractor(BaseExtractor):
         lines = text.split('\n')
         
         for line in lines:
-            # Liverpool MSI pattern: DESCRIPTION X de Y MESES $PAYMENT
-            msi_match = re.match(
-                r'(.+?)\s+(\d+)\s+de\s+(\d+)\s+(?:MESES|meses)\s+\$?\s*([0-9,]+\.?\d*)',
-                line,
-                re.IGNORECASE
-            )
+            # Liverpool MSI pattern
+            msi_match = MSI_RE.match(line)
             
             if msi_match:
                 try:
@@ -261,7 +272,7 @@ class LiverpoolDebitExtractor(BaseExtractor):
     def bank_name(self) -> str:
         return "liverpool_debit"
     
-    def can_parse(self, file_path: str) -> bool:
+    def can_parse(self, file_path: str, page_texts: Optional[PageTexts] = None) -> bool:
         """Check if file is a Liverpool debit card statement."""
         try:
             # Try OCR
@@ -271,16 +282,16 @@ class LiverpoolDebitExtractor(BaseExtractor):
                 
                 images = convert_from_path(file_path, first_page=1, last_page=1)
                 if images:
-                    text = pytesseract.image_to_string(images[0], lang='spa+eng')
-                    return ('LIVERPOOL' in text.upper() and 
-                            ('DEBITO' in text.upper() or 'CUENTA' in text.upper()))
+                    text_upper = pytesseract.image_to_string(images[0], lang='spa+eng').upper()
+                    return ('LIVERPOOL' in text_upper and 
+                            ('DEBITO' in text_upper or 'CUENTA' in text_upper))
             
             return False
         except Exception:
             return False
     
-    def parse(self, file_path: str):
-        """Parse Liverpool debit statement using OCR."""
+    def parse(self, file_path: str, data: Optional[bytes] = None):
+        """Parse Liverpool debit statement using OCR (data unused, see credit)."""
         if not OCR_AVAILABLE:
             raise ImportError("OCR dependencies not installed")
         
@@ -308,8 +319,6 @@ class LiverpoolDebitExtractor(BaseExtractor):
             
             return statement, transactions, installment_plans
             
-        except Exception as e:
-            print(f"Error parsing Liverpool debit statement: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error parsing Liverpool debit statement")
             return None, [], []
@@ -1,6 +1,6 @@
 """Database setup and configuration."""
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.pool import StaticPool
 import os
@@ -10,6 +10,12 @@ import yaml
 # Base class for all models
 Base = declarative_base()
 
+# Indexes of older versions, replaced by ones covering their columns
+SUPERSEDED_INDEXES = ('idx_processing_file_hash', 'idx_transactions_date')
+
+# SQLite user_version of databases whose file hashes are raw digests
+RAW_FILE_HASH_VERSION = 1
+
 
 def _load_config():
     """Load configuration from settings.yaml."""
@@ -50,11 +56,47 @@ def create_db_engine(echo=False):
         SQLAlchemy engine
     """
     url = get_database_url()
-    return create_engine(
+    engine = create_engine(
         url,
         echo=echo,
-        connect_args={"check_same_thread": False},  # Needed for SQLite
+        # check_same_thread: needed for SQLite; timeout: wait for other
+        # writers (e.g. a script running alongside) instead of failing
+        connect_args={"check_same_thread": False, "timeout": 30},
+        insertmanyvalues_page_size=10_000,  # Fewer statements for bulk inserts
     )
+    
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself, so SAVEPOINTs work with pysqlite
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        # WAL with synchronous=NORMAL syncs on checkpoints, not every commit
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+    
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+    
+    return engine
+
+
+_default_engine = None
+
+
+def _get_default_engine():
+    """
+    Get the engine for the configured database, created once per process.
+    
+    Sharing it lets every session reuse the engine's connection pool
+    instead of opening (and configuring) new connections each time.
+    """
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = create_db_engine()
+    return _default_engine
 
 
 def get_session_maker(engine=None):
@@ -68,7 +110,7 @@ def get_session_maker(engine=None):
         Session class
     """
     if engine is None:
-        engine = create_db_engine()
+        engine = _get_default_engine()
     
     return sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
@@ -81,13 +123,82 @@ def init_db(engine=None):
         engine: SQLAlchemy engine (creates new one if not provided)
     """
     if engine is None:
-        engine = create_db_engine()
+        engine = _get_default_engine()
     
     # Import all models to ensure they're registered
     from . import statement, transaction, installment, merchant, processing_log
     
     # Create all tables
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    _add_missing_indexes(engine)
+    _convert_hex_file_hashes(engine)
+
+
+def _add_missing_columns(engine):
+    """
+    Add nullable columns introduced after a table was created.
+    
+    create_all only creates missing tables, so databases from older
+    versions would otherwise lack newer columns.
+    
+    Args:
+        engine: SQLAlchemy engine
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+
+def _add_missing_indexes(engine):
+    """
+    Create indexes introduced after a table was created.
+    
+    Like columns, create_all only creates indexes along with new tables.
+    Indexes they replace are dropped, so inserts don't keep both up to date.
+    
+    Args:
+        engine: SQLAlchemy engine
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for name in SUPERSEDED_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        for table in Base.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+
+
+def _convert_hex_file_hashes(engine):
+    """
+    Convert file hashes stored as hex text by older versions to raw bytes.
+    
+    Runs once per database: the filter scans the whole table, so the
+    conversion is recorded in SQLite's user_version.
+    
+    Args:
+        engine: SQLAlchemy engine
+    """
+    with engine.begin() as conn:
+        if conn.execute(text("PRAGMA user_version")).scalar() >= RAW_FILE_HASH_VERSION:
+            return
+        rows = conn.execute(text(
+            "SELECT id, file_hash FROM processing_log WHERE typeof(file_hash) = 'text'"
+        )).all()
+        if rows:
+            conn.execute(
+                text("UPDATE processing_log SET file_hash = :file_hash WHERE id = :id"),
+                [{'id': row.id, 'file_hash': bytes.fromhex(row.file_hash)} for row in rows]
+            )
+        conn.execute(text(f"PRAGMA user_version = {RAW_FILE_HASH_VERSION}"))
 
 
 def get_session(engine=None):
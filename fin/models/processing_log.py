@@ -1,6 +1,6 @@
 """ProcessingLog model for tracking PDF processing."""
 
-from sqlalchemy import Column, String, DateTime, Integer, Text, Index, func
+from sqlalchemy import Column, String, DateTime, Integer, Text, Index, LargeBinary, func
 from .database import Base
 import uuid
 from datetime import datetime
@@ -16,8 +16,10 @@ class ProcessingLog(Base):
     
     # File information
     file_path = Column(String, nullable=False)
-    file_hash = Column(String, nullable=False)  # SHA256
+    file_hash = Column(LargeBinary(32), nullable=False)  # Raw digest, b'' if never hashed (failed --force runs)
+    hash_algo = Column(String)  # 'blake3' or 'sha256' (NULL: sha256)
     file_size = Column(Integer)
+    mtime_ns = Column(Integer)  # Modification time, to skip re-hashing unchanged files
     
     # Processing information
     bank_detected = Column(String)
@@ -34,7 +36,9 @@ class ProcessingLog(Base):
     
     # Indexes
     __table_args__ = (
-        Index('idx_processing_file_hash', 'file_hash'),
+        # Covering indexes for the already-processed checks
+        Index('idx_processing_hash_algo', 'file_hash', 'hash_algo'),
+        Index('idx_processing_file_stat', 'file_path', 'file_size', 'mtime_ns'),
     )
     
     def __repr__(self):
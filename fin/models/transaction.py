@@ -43,7 +43,9 @@ class Transaction(Base):
     is_recurring = Column(Boolean, default=False)
     is_subscription = Column(Boolean, default=False)
     is_reversal = Column(Boolean, default=False)
+    is_duplicate = Column(Boolean, default=False)
     is_installment_payment = Column(Boolean, default=False)
+    related_transaction_id = Column(String, ForeignKey('transactions.id'))  # Reversed charge (reversals)
     
     # Installment information
     installment_plan_id = Column(String, ForeignKey('installment_plans.id'))
@@ -63,7 +65,7 @@ class Transaction(Base):
     
     # Indexes
     __table_args__ = (
-        Index('idx_transactions_date', 'date'),
+        Index('idx_transactions_date_statement', 'date', 'statement_id'),
         Index('idx_transactions_category', 'category'),
         Index('idx_transactions_statement', 'statement_id'),
         Index('idx_transactions_merchant', 'merchant_id'),
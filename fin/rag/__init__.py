@@ -1,9 +1,24 @@
 """RAG (Retrieval-Augmented Generation) package for financial chat."""
 
-from .retrieval import RetrievalEngine
-from .chat_engine import ChatEngine
+import importlib
+
+# Loaded on first access (PEP 562): they pull in the embedding model and
+# vector store, which submodules like prompts or calculations don't need
+_LAZY_IMPORTS = {
+    'RetrievalEngine': '.retrieval',
+    'ChatEngine': '.chat_engine',
+}
 
 __all__ = [
     'RetrievalEngine',
     'ChatEngine',
 ]
+
+
+def __getattr__(name):
+    """Import a lazily loaded class on first access."""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -38,15 +38,11 @@ class FinancialCalculator:
         Returns:
             Total amount spent
         """
-        transactions = self.session.query(Transaction).filter(
+        return self._expense_total(
             Transaction.category == category,
             Transaction.date >= start_date,
-            Transaction.date <= end_date,
-            Transaction.transaction_type == 'expense'
-        ).all()
-        
-        total = sum(abs(Decimal(str(t.amount))) for t in transactions)
-        return total
+            Transaction.date <= end_date
+        )
     
     def calculate_average_monthly(
         self,
@@ -68,14 +64,10 @@ class FinancialCalculator:
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=months_back * 30)
         
-        query = self.session.query(Transaction).filter(
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
-            Transaction.transaction_type == 'expense'
-        )
+        conditions = [Transaction.date >= start_date, Transaction.date <= end_date]
         
         if category:
-            query = query.filter(Transaction.category == category)
+            conditions.append(Transaction.category == category)
         
         if merchant_name:
             # Find merchant
@@ -84,16 +76,33 @@ class FinancialCalculator:
             ).first()
             
             if merchant:
-                query = query.filter(Transaction.merchant_id == merchant.id)
+                conditions.append(Transaction.merchant_id == merchant.id)
         
-        transactions = query.all()
+        total = self._expense_total(*conditions)
         
-        if not transactions:
+        if not total:
             return Decimal('0')
         
-        total = sum(abs(Decimal(str(t.amount))) for t in transactions)
         return total / months_back if months_back > 0 else Decimal('0')
     
+    def _expense_total(self, *conditions) -> Decimal:
+        """
+        Sum the absolute amounts of the expenses matching some conditions.
+        
+        The database adds them up, so no transactions are loaded.
+        
+        Args:
+            *conditions: Filters on Transaction
+        
+        Returns:
+            Total amount, to the cent
+        """
+        total = self.session.query(
+            func.coalesce(func.sum(func.abs(Transaction.amount)), 0)
+        ).filter(Transaction.transaction_type == 'expense', *conditions).scalar()
+        # SQLite sums in floating point; amounts have two decimals
+        return Decimal(str(total)).quantize(Decimal('0.01'))
+    
     def project_savings(
         self,
         current_monthly: float,
@@ -3,25 +3,39 @@
 from sqlalchemy.orm import Session
 from fin.models import Transaction
 from collections import defaultdict
-from datetime import timedelta
+from typing import Dict, List, Optional
 
 
-def detect_duplicates(session: Session, statement_id: int) -> int:
+def _transactions_by_statement(
+    session: Session,
+    statement_id: Optional[int] = None,
+    statement_ids: Optional[List[int]] = None
+) -> Dict[int, List[Transaction]]:
     """
-    Detect duplicate transactions within a statement.
+    Load the transactions of one or more statements with a single query.
     
     Args:
         session: Database session
-        statement_id: ID of the statement to check
-        
+        statement_id: ID of a single statement
+        statement_ids: IDs of several statements (instead of statement_id)
+    
     Returns:
-        Number of duplicates found
+        Dict of statement ID -> its transactions ordered by date
     """
-    # Get all transactions for this statement
-    transactions = session.query(Transaction).filter_by(
-        statement_id=statement_id
-    ).all()
+    ids = statement_ids if statement_ids is not None else [statement_id]
+    
+    transactions = session.query(Transaction).filter(
+        Transaction.statement_id.in_(ids)
+    ).order_by(Transaction.statement_id, Transaction.date).all()
     
+    by_statement = defaultdict(list)
+    for t in transactions:
+        by_statement[t.statement_id].append(t)
+    return by_statement
+
+
+def _flag_duplicates(transactions: List[Transaction]) -> int:
+    """Flag duplicates among the transactions of one statement."""
     # Group by (date, amount, normalized_description)
     groups = defaultdict(list)
     for t in transactions:
@@ -41,22 +55,8 @@ def detect_duplicates(session: Session, statement_id: int) -> int:
     return duplicates_count
 
 
-def detect_reversals(session: Session, statement_id: int) -> int:
-    """
-    Detect reversal pairs (charge + refund that cancel each other).
-    
-    Args:
-        session: Database session
-        statement_id: ID of the statement to check
-        
-    Returns:
-        Number of reversals found
-    """
-    # Get all transactions ordered by date
-    transactions = session.query(Transaction).filter_by(
-        statement_id=statement_id
-    ).order_by(Transaction.date).all()
-    
+def _flag_reversals(transactions: List[Transaction]) -> int:
+    """Flag reversal pairs among the date-ordered transactions of one statement."""
     reversals_count = 0
     
     # Look for same amount opposite sign within 3 days
@@ -64,7 +64,7 @@ def detect_reversals(session: Session, statement_id: int) -> int:
         # Skip if already marked as reversal
         if t1.is_reversal:
             continue
-            
+        
         for t2 in transactions[i+1:]:
             # Only check within 3 days
             if (t2.date - t1.date).days > 3:
@@ -87,19 +87,58 @@ def detect_reversals(session: Session, statement_id: int) -> int:
     return reversals_count
 
 
-def detect_all(session: Session, statement_id: int) -> dict:
+def detect_duplicates(session: Session, statement_id: Optional[int] = None,
+                      statement_ids: Optional[List[int]] = None) -> int:
     """
-    Run all detection algorithms on a statement.
+    Detect duplicate transactions within a statement.
     
     Args:
         session: Database session
         statement_id: ID of the statement to check
-        
+        statement_ids: IDs of several statements to check (instead of statement_id)
+    
+    Returns:
+        Number of duplicates found
+    """
+    by_statement = _transactions_by_statement(session, statement_id, statement_ids)
+    return sum(_flag_duplicates(transactions) for transactions in by_statement.values())
+
+
+def detect_reversals(session: Session, statement_id: Optional[int] = None,
+                     statement_ids: Optional[List[int]] = None) -> int:
+    """
+    Detect reversal pairs (charge + refund that cancel each other).
+    
+    Args:
+        session: Database session
+        statement_id: ID of the statement to check
+        statement_ids: IDs of several statements to check (instead of statement_id)
+    
+    Returns:
+        Number of reversals found
+    """
+    by_statement = _transactions_by_statement(session, statement_id, statement_ids)
+    return sum(_flag_reversals(transactions) for transactions in by_statement.values())
+
+
+def detect_all(session: Session, statement_id: Optional[int] = None,
+               statement_ids: Optional[List[int]] = None) -> dict:
+    """
+    Run all detection algorithms on one or more statements.
+    
+    Their transactions are loaded once, with a single query.
+    
+    Args:
+        session: Database session
+        statement_id: ID of the statement to check
+        statement_ids: IDs of several statements to check (instead of statement_id)
+    
     Returns:
         Dictionary with detection results
     """
-    duplicates = detect_duplicates(session, statement_id)
-    reversals = detect_reversals(session, statement_id)
+    by_statement = _transactions_by_statement(session, statement_id, statement_ids)
+    duplicates = sum(_flag_duplicates(transactions) for transactions in by_statement.values())
+    reversals = sum(_flag_reversals(transactions) for transactions in by_statement.values())
     
     return {
         'duplicates': duplicates,
@@ -5,6 +5,10 @@ from typing import Optional
 import re
 
 
+# Currency symbols and whitespace, removed from every parsed amount
+_CURRENCY_RE = re.compile(r'[\$\s]')
+
+
 def parse_amount(text: str) -> Optional[Decimal]:
     """
     Parse a money amount in Mexican format (e.g., '$1,234.56' or '($100.00)').
@@ -28,7 +32,7 @@ def parse_amount(text: str) -> Optional[Decimal]:
         text = text[1:-1]
     
     # Remove currency symbols and whitespace
-    text = re.sub(r'[\$\s]', '', text)
+    text = _CURRENCY_RE.sub('', text)
     
     # Remove thousands separators (commas)
     text = text.replace(',', '')
@@ -5,6 +5,21 @@ import re
 from typing import Optional, Tuple
 
 
+# Patterns used for every transaction, compiled once
+_NON_ALNUM_RE = re.compile(r'[^A-Z0-9]+')
+_CARD_DIGITAL_RE = re.compile(r'Tarjeta Digital \*+\d+', re.IGNORECASE)
+_CARD_DIGITS_RE = re.compile(r'\*+\d{4}')
+_INSTALLMENT_RE = re.compile(r'\d+\s+[Dd][Ee]\s+\d+')
+_LOCATION_SUFFIX_RE = re.compile(r'\s+[A-Z]{3,4}$')
+_CARD_DIGITS_GROUP_RE = re.compile(r'\*+(\d{4})')
+_INSTALLMENT_GROUPS_RE = re.compile(r'(\d+)\s+DE\s+(\d+)')
+_LOCATION_CODE_RE = re.compile(r'\b([A-Z]{3,4})$')
+_CLEAN_CARD_DIGITAL_RE = re.compile(r'TARJETA\s+DIGITAL\s+\*+\d+')
+_CLEAN_INSTALLMENT_RE = re.compile(r'\d+\s+DE\s+\d+')
+_TRAILING_SEPARATOR_RE = re.compile(r'\s*[;,]\s*$')
+_SPACES_RE = re.compile(r'\s+')
+
+
 def normalize_description(text: str) -> str:
     """
     Normalize transaction description for matching and classification.
@@ -26,14 +41,12 @@ def normalize_description(text: str) -> str:
     # Convert to uppercase
     text = text.upper()
     
-    # Remove accents
-    text = unidecode(text)
-    
-    # Remove special characters except spaces and alphanumeric
-    text = re.sub(r'[^A-Z0-9\s]', ' ', text)
+    # Remove accents (plain ASCII is already accent-free)
+    if not text.isascii():
+        text = unidecode(text)
     
-    # Collapse multiple spaces
-    text = re.sub(r'\s+', ' ', text)
+    # Replace each run of special characters and spaces with one space
+    text = _NON_ALNUM_RE.sub(' ', text)
     
     return text.strip()
 
@@ -51,7 +64,7 @@ def extract_card_digits(text: str) -> Optional[str]:
     if not text:
         return None
     
-    match = re.search(r'\*+(\d{4})', text)
+    match = _CARD_DIGITS_GROUP_RE.search(text)
     if match:
         return match.group(1)
     
@@ -72,7 +85,7 @@ def extract_installment_info(text: str) -> Optional[Tuple[int, int]]:
         return None
     
     # Match patterns like "5 DE 12" or "05 DE 12"
-    match = re.search(r'(\d+)\s+DE\s+(\d+)', text.upper())
+    match = _INSTALLMENT_GROUPS_RE.search(text.upper())
     if match:
         current = int(match.group(1))
         total = int(match.group(2))
@@ -98,20 +111,20 @@ def clean_merchant_name(text: str) -> str:
     text = normalize_description(text)
     
     # Remove card digit references
-    text = re.sub(r'TARJETA\s+DIGITAL\s+\*+\d+', '', text)
-    text = re.sub(r'\*+\d{4}', '', text)
+    text = _CLEAN_CARD_DIGITAL_RE.sub('', text)
+    text = _CARD_DIGITS_RE.sub('', text)
     
     # Remove installment info
-    text = re.sub(r'\d+\s+DE\s+\d+', '', text)
+    text = _CLEAN_INSTALLMENT_RE.sub('', text)
     
     # Remove common separators at the end
-    text = re.sub(r'\s*[;,]\s*$', '', text)
+    text = _TRAILING_SEPARATOR_RE.sub('', text)
     
     # Remove location codes at the end (3-4 uppercase letters)
-    text = re.sub(r'\s+[A-Z]{3,4}$', '', text)
+    text = _LOCATION_SUFFIX_RE.sub('', text)
     
     # Collapse spaces again
-    text = re.sub(r'\s+', ' ', text)
+    text = _SPACES_RE.sub(' ', text)
     
     return text.strip()
 
@@ -136,23 +149,17 @@ def extract_merchant_name(description: str) -> str:
     text = description
     
     # Remove card references first
-    text = re.sub(r'Tarjeta Digital \*+\d+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\*+\d{4}', '', text)
+    text = _CARD_DIGITAL_RE.sub('', text)
+    text = _CARD_DIGITS_RE.sub('', text)
     
     # Remove installment references
-    text = re.sub(r'\d+\s+[Dd][Ee]\s+\d+', '', text)
+    text = _INSTALLMENT_RE.sub('', text)
     
-    # Remove separators
-    text = re.sub(r'\s*[;,]\s*', ' ', text)
-    
-    # Normalize and clean
+    # Normalize and clean (separators become single spaces)
     text = normalize_description(text)
     
     # Remove location codes at the end
-    text = re.sub(r'\s+[A-Z]{3,4}$', '', text)
-    
-    # Final cleanup
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _LOCATION_SUFFIX_RE.sub('', text)
     
     return text
 
@@ -234,7 +241,7 @@ def extract_location_code(description: str) -> Optional[str]:
         return None
     
     # Look for 3-4 uppercase letters at the end
-    match = re.search(r'\b([A-Z]{3,4})$', description.upper())
+    match = _LOCATION_CODE_RE.search(description.upper())
     if match:
         return match.group(1)
     
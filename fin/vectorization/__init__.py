@@ -1,11 +1,26 @@
 """Vectorization package for embeddings and vector store."""
 
-from .embeddings import EmbeddingGenerator
-from .vector_store import FinancialVectorStore
-from .index_pipeline import IndexPipeline
+import importlib
+
+# Loaded on first access (PEP 562): sentence-transformers and chromadb
+# take seconds to import, and only indexing and chat use them
+_LAZY_IMPORTS = {
+    'EmbeddingGenerator': '.embeddings',
+    'FinancialVectorStore': '.vector_store',
+    'IndexPipeline': '.index_pipeline',
+}
 
 __all__ = [
     'EmbeddingGenerator',
     'FinancialVectorStore',
     'IndexPipeline',
 ]
+
+
+def __getattr__(name):
+    """Import a lazily loaded class on first access."""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""Rehash processed files logged with another algorithm than the current one."""
+
+import os
+from sqlalchemy import or_
+from fin.cli import HASH_ALGORITHM, _calculate_file_hash
+from fin.models import init_db, get_session, ProcessingLog
+
+init_db()
+session = get_session()
+
+logs = session.query(ProcessingLog).filter(
+    or_(ProcessingLog.hash_algo.is_(None), ProcessingLog.hash_algo != HASH_ALGORITHM)
+).all()
+
+updated = 0
+missing = 0
+for log in logs:
+    if not os.path.exists(log.file_path):
+        missing += 1
+        continue
+    log.file_hash = _calculate_file_hash(log.file_path)
+    log.hash_algo = HASH_ALGORITHM
+    updated += 1
+
+session.commit()
+session.close()
+
+print(f'Rehashed {updated} files with {HASH_ALGORITHM}')
+if missing:
+    print(f'{missing} files no longer exist and keep their old hash')
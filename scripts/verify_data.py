@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Quick script to verify parsed data."""
 
+from sqlalchemy import select, func
 from fin.models import get_session, Statement, Transaction, InstallmentPlan
 
 session = get_session()
@@ -15,8 +16,18 @@ if stmt:
     print(f'Minimum Payment: ${stmt.minimum_payment}')
     print(f'Account: ***{stmt.account_number}')
     
-    print(f'\n=== Transactions ({len(stmt.transactions)}) ===')
-    for i, t in enumerate(stmt.transactions[:10], 1):
+    # Count and preview with Core selects instead of loading every transaction
+    transaction_count = session.scalar(
+        select(func.count(Transaction.id)).where(Transaction.statement_id == stmt.id)
+    )
+    preview = session.execute(
+        select(Transaction.date, Transaction.description, Transaction.amount, Transaction.transaction_type)
+        .where(Transaction.statement_id == stmt.id)
+        .limit(10)
+    )
+    
+    print(f'\n=== Transactions ({transaction_count}) ===')
+    for i, t in enumerate(preview, 1):
         print(f'{i}. {t.date} - {t.description[:40]:40} - ${t.amount:>10.2f} [{t.transaction_type}]')
     
     print(f'\n=== Installment Plans ({len(stmt.installment_plans)}) ===')
@@ -37,6 +37,17 @@ setup(
             "pytest>=7.4.0",
             "pytest-cov>=4.1.0",
         ],
+        # Optional speedups; each is skipped at runtime when missing
+        "fast": [
+            "hyperscan>=0.7.0",  # Multi-pattern rule matching
+            "google-re2>=1.1",  # Rule matching where hyperscan has no wheel
+            "orjson>=3.9.0",  # Parsing LLM responses
+            "blake3>=0.4.0",  # File hashing for duplicate detection
+        ],
+        # Faster bank detection; PyMuPDF is AGPL-licensed, so opt-in only
+        "pymupdf": [
+            "PyMuPDF>=1.24.3",
+        ],
     },
     entry_points={
         "console_scripts": [
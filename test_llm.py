@@ -27,35 +27,20 @@ def test_classification():
     
     classifier = LLMClassifier(model="qwen2.5:7b")
     
+    # (id, description, amount)
     test_transactions = [
-        {
-            'id': 1,
-            'description': 'NETFLIX.COM',
-            'amount': 199.00
-        },
-        {
-            'id': 2,
-            'description': 'UBER EATS',
-            'amount': 450.50
-        },
-        {
-            'id': 3,
-            'description': 'OXXO HDA DEL VALLE',
-            'amount': 89.50
-        },
-        {
-            'id': 4,
-            'description': 'SMARTFIT MENSUALIDAD',
-            'amount': 599.00
-        }
+        (1, 'NETFLIX.COM', 199.00),
+        (2, 'UBER EATS', 450.50),
+        (3, 'OXXO HDA DEL VALLE', 89.50),
+        (4, 'SMARTFIT MENSUALIDAD', 599.00)
     ]
     
     try:
         results = classifier.classify_batch(test_transactions)
         
         print("\nResults:")
-        for trans, (category, subcategory, confidence) in zip(test_transactions, results):
-            print(f"  {trans['description']:<30} → {category}/{subcategory} ({confidence:.2f})")
+        for (_, description, _), (category, subcategory, confidence) in zip(test_transactions, results):
+            print(f"  {description:<30} → {category}/{subcategory} ({confidence:.2f})")
         
         return True
     
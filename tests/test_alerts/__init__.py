@@ -0,0 +1 @@
+"""Test package for alerts."""
@@ -0,0 +1,166 @@
+"""Tests for alert detection."""
+
+import pytest
+from fin.alerts import AlertDetector, AlertLevel
+from fin.models import Transaction
+from decimal import Decimal
+from datetime import date
+
+
+def _add_transaction(session, statement, day, amount, transaction_type='expense', category=None):
+    """Add a transaction to the session."""
+    transaction = Transaction()
+    transaction.statement_id = statement.id
+    transaction.date = day
+    transaction.description = f"TEST {category or transaction_type}"
+    transaction.amount = Decimal(str(amount))
+    transaction.transaction_type = transaction_type
+    transaction.category = category
+    session.add(transaction)
+    return transaction
+
+
+def _titles(alerts):
+    return [a.title for a in alerts]
+
+
+def test_category_dominance(db_session, sample_statement):
+    """Test alert when one category dominates the month's expenses."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    _add_transaction(db_session, sample_statement, date(2025, 12, 2), 800, category='compras')
+    _add_transaction(db_session, sample_statement, date(2025, 12, 3), 100, category='alimentacion')
+    _add_transaction(db_session, sample_statement, date(2025, 12, 4), 100)
+    # Other months and non-expenses are ignored
+    _add_transaction(db_session, sample_statement, date(2025, 11, 30), 5000, category='alimentacion')
+    _add_transaction(db_session, sample_statement, date(2025, 12, 5), -5000, 'payment', 'alimentacion')
+    db_session.commit()
+
+    alerts = AlertDetector(db_session)._detect_category_dominance(2025, 12)
+
+    assert len(alerts) == 1
+    assert alerts[0].category == 'compras'
+    assert alerts[0].value == pytest.approx(80.0)
+
+
+def test_category_dominance_below_threshold(db_session, sample_statement):
+    """Test no alert when spending is spread across categories."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    for i, category in enumerate(['a', 'b', 'c', 'd']):
+        _add_transaction(db_session, sample_statement, date(2025, 12, i + 1), 100, category=category)
+    db_session.commit()
+
+    assert AlertDetector(db_session)._detect_category_dominance(2025, 12) == []
+
+
+def test_gastos_hormiga(db_session, sample_statement):
+    """Test convenience store spending alert."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    _add_transaction(db_session, sample_statement, date(2025, 12, 1), 1500, category='gastos_hormiga')
+    _add_transaction(db_session, sample_statement, date(2025, 12, 31), 700, category='gastos_hormiga')
+    _add_transaction(db_session, sample_statement, date(2026, 1, 1), 9000, category='gastos_hormiga')
+    db_session.commit()
+
+    alerts = AlertDetector(db_session)._detect_gastos_hormiga(2025, 12)
+
+    assert len(alerts) == 1
+    assert alerts[0].value == pytest.approx(550.0)
+
+
+def test_fees(db_session, sample_statement):
+    """Test fee alert sums the month's fees."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    _add_transaction(db_session, sample_statement, date(2025, 12, 10), 500, 'fee')
+    _add_transaction(db_session, sample_statement, date(2025, 12, 11), 80.5, 'fee')
+    db_session.commit()
+
+    alerts = AlertDetector(db_session)._detect_fees(2025, 12)
+
+    assert len(alerts) == 1
+    assert alerts[0].value == pytest.approx(580.5)
+    assert AlertDetector(db_session)._detect_fees(2025, 11) == []
+
+
+def test_unusual_spending(db_session, sample_statement):
+    """Test alert when the month is far above the 6-month average."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    history = [(2025, 6, 1000), (2025, 7, 1100), (2025, 8, 900),
+               (2025, 9, 1000), (2025, 10, 1050), (2025, 11, 950)]
+    for year, month, amount in history:
+        _add_transaction(db_session, sample_statement, date(year, month, 15), amount)
+    _add_transaction(db_session, sample_statement, date(2025, 12, 15), 5000)
+    db_session.commit()
+
+    alerts = AlertDetector(db_session)._detect_unusual_spending(2025, 12)
+
+    assert len(alerts) == 1
+    assert alerts[0].level == AlertLevel.CRITICAL
+    assert alerts[0].value == pytest.approx(5000.0)
+
+
+def test_unusual_spending_across_year_boundary(db_session, sample_statement):
+    """Test the 6-month window wraps into the previous year."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    history = [(2025, 8, 1000), (2025, 9, 1100), (2025, 10, 900),
+               (2025, 11, 1000), (2025, 12, 1050), (2026, 1, 950)]
+    for year, month, amount in history:
+        _add_transaction(db_session, sample_statement, date(year, month, 1), amount)
+    _add_transaction(db_session, sample_statement, date(2026, 2, 1), 1000)
+    db_session.commit()
+
+    assert AlertDetector(db_session)._detect_unusual_spending(2026, 2) == []
+
+
+def test_ending_msi(db_session, sample_statement, sample_installment_plan):
+    """Test alert for installment plans ending soon."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    sample_installment_plan.statement_id = sample_statement.id
+    sample_installment_plan.end_date_calculated = date.today()
+    db_session.add(sample_installment_plan)
+    db_session.commit()
+
+    alerts = AlertDetector(db_session)._detect_ending_msi()
+
+    assert len(alerts) == 1
+    assert alerts[0].value == pytest.approx(1000.0)
+
+
+def test_detect_all_sorted_by_severity(db_session, sample_statement):
+    """Test detect_all returns critical alerts first."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    for month in range(6, 12):
+        _add_transaction(db_session, sample_statement, date(2025, month, 15), 1000 + month, category='compras')
+    _add_transaction(db_session, sample_statement, date(2025, 12, 15), 9000, category='compras')
+    _add_transaction(db_session, sample_statement, date(2025, 12, 16), 300, 'fee')
+    db_session.commit()
+
+    alerts = AlertDetector(db_session).detect_all(2025, 12)
+
+    assert _titles(alerts) == ["Gasto Inusualmente Alto", "Categoría Dominante", "Comisiones Cobradas"]
+
+
+def test_detect_all_cached_until_data_changes(db_session, sample_statement):
+    """Test repeated detect_all calls reuse results until data changes."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    _add_transaction(db_session, sample_statement, date(2025, 12, 16), 300, 'fee')
+    db_session.commit()
+
+    detector = AlertDetector(db_session)
+    first = detector.detect_all(2025, 12)
+    assert _titles(first) == ["Comisiones Cobradas"]
+    assert detector.detect_all(2025, 12)[0] is first[0]
+
+    _add_transaction(db_session, sample_statement, date(2025, 12, 17), 200, 'fee')
+    db_session.commit()
+
+    alerts = detector.detect_all(2025, 12)
+    assert alerts[0] is not first[0]
+    assert alerts[0].value == pytest.approx(500.0)
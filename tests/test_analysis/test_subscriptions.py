@@ -0,0 +1,125 @@
+"""Tests for subscription detection."""
+
+import pytest
+from fin.analysis import SubscriptionDetector, get_active_subscriptions
+from fin.models import Transaction, Merchant
+from decimal import Decimal
+from datetime import date, timedelta
+
+
+def _add_merchant(session, name, category=None):
+    """Add a merchant to the session."""
+    merchant = Merchant(name=name, normalized_name=name.upper(), category=category)
+    session.add(merchant)
+    session.flush()
+    return merchant
+
+
+def _add_charges(session, statement, merchant, dates, amounts, transaction_type='expense'):
+    """Add one charge per (date, amount) pair for a merchant."""
+    for day, amount in zip(dates, amounts):
+        transaction = Transaction()
+        transaction.statement_id = statement.id
+        transaction.merchant_id = merchant.id
+        transaction.date = day
+        transaction.description = merchant.name
+        transaction.amount = Decimal(str(amount))
+        transaction.transaction_type = transaction_type
+        session.add(transaction)
+
+
+def _by_name(subscriptions):
+    return {s['merchant_name']: s for s in subscriptions}
+
+
+@pytest.fixture
+def populated_session(db_session, sample_statement):
+    """Session with a mix of recurring and one-off merchants."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    monthly = [date(2025, 9, 5), date(2025, 10, 5), date(2025, 11, 5), date(2025, 12, 5)]
+
+    gym = _add_merchant(db_session, 'Smart Gym', 'salud')
+    _add_charges(db_session, sample_statement, gym, monthly, [499, 499, 499, 499])
+
+    # Known service with varying amounts
+    netflix = _add_merchant(db_session, 'Netflix Mexico', 'entretenimiento')
+    _add_charges(db_session, sample_statement, netflix, monthly, [99, 199, 299, 139])
+
+    # Varying amounts, unknown merchant
+    market = _add_merchant(db_session, 'Mercado Local')
+    _add_charges(db_session, sample_statement, market, monthly, [100, 900, 250, 40])
+
+    # Single charge
+    shop = _add_merchant(db_session, 'Tienda Unica')
+    _add_charges(db_session, sample_statement, shop, [date(2025, 12, 1)], [1000])
+
+    # Payments are not charges
+    bank = _add_merchant(db_session, 'Pago Tarjeta')
+    _add_charges(db_session, sample_statement, bank, monthly, [-500] * 4, 'payment')
+
+    db_session.commit()
+    return db_session
+
+
+def test_detect_subscriptions(populated_session):
+    """Test recurring monthly charges are detected."""
+    subs = _by_name(SubscriptionDetector().detect_subscriptions(populated_session))
+
+    assert set(subs) == {'Smart Gym', 'Netflix Mexico'}
+
+    gym = subs['Smart Gym']
+    assert gym['frequency'] == 'monthly'
+    assert gym['count'] == 4
+    assert gym['average_amount'] == Decimal('499.00')
+    assert gym['amount_variation'] == pytest.approx(0.0)
+    assert gym['first_payment'] == date(2025, 9, 5)
+    assert gym['last_payment'] == date(2025, 12, 5)
+    assert gym['is_known_subscription'] is False
+    assert gym['category'] == 'salud'
+
+    assert subs['Netflix Mexico']['is_known_subscription'] is True
+    assert subs['Netflix Mexico']['average_amount'] == Decimal('184.00')
+
+
+def test_detect_subscriptions_irregular_interval(db_session, sample_statement):
+    """Test charges far apart are not reported unless known."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    merchant = _add_merchant(db_session, 'Seguro Anual')
+    _add_charges(db_session, sample_statement, merchant, [date(2024, 1, 1), date(2025, 1, 1)], [3000, 3000])
+    db_session.commit()
+
+    assert SubscriptionDetector().detect_subscriptions(db_session) == []
+
+
+def test_mark_subscription_transactions(populated_session):
+    """Test transactions of detected subscriptions are flagged."""
+    marked, subscriptions = SubscriptionDetector().mark_subscription_transactions(populated_session)
+
+    assert subscriptions == 2
+    assert marked == 8
+    flagged = populated_session.query(Transaction).filter(Transaction.is_subscription == True).count()
+    assert flagged == 8
+
+    # Already flagged transactions are not counted again
+    marked, _ = SubscriptionDetector().mark_subscription_transactions(populated_session)
+    assert marked == 0
+
+
+def test_get_active_subscriptions(db_session, sample_statement):
+    """Test only recent subscriptions are returned, largest first."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    today = date.today()
+    recent = [today - timedelta(days=60), today - timedelta(days=30), today]
+    old = [date(2020, 1, 1), date(2020, 2, 1), date(2020, 3, 1)]
+
+    _add_charges(db_session, sample_statement, _add_merchant(db_session, 'Spotify'), recent, [129] * 3)
+    _add_charges(db_session, sample_statement, _add_merchant(db_session, 'Gimnasio'), recent, [650] * 3)
+    _add_charges(db_session, sample_statement, _add_merchant(db_session, 'Revista'), old, [80] * 3)
+    db_session.commit()
+
+    active = get_active_subscriptions(db_session)
+
+    assert [s['merchant_name'] for s in active] == ['Gimnasio', 'Spotify']
@@ -0,0 +1,156 @@
+"""Tests for the transaction classifier."""
+
+import pytest
+from fin.classification import RuleEngine, TransactionClassifier
+from fin.models import Transaction, Merchant
+from fin.utils import normalize_description
+from decimal import Decimal
+from datetime import date
+
+
+RULES_YAML = """
+rules:
+  - pattern: 'OXXO'
+    category: 'gastos_hormiga'
+    subcategory: 'conveniencia'
+    priority: 10
+"""
+
+
+@pytest.fixture
+def classifier(tmp_path):
+    """Classifier using only merchant history and a small rules file."""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(RULES_YAML, encoding='utf-8')
+    return TransactionClassifier(rule_engine=RuleEngine(rules_file=str(rules_file)), use_llm=False)
+
+
+def _transaction(statement, description):
+    transaction = Transaction()
+    transaction.statement_id = statement.id
+    transaction.date = date(2025, 12, 1)
+    transaction.description = description
+    transaction.description_normalized = normalize_description(description)
+    transaction.amount = Decimal('100.00')
+    transaction.transaction_type = 'expense'
+    return transaction
+
+
+def test_classify_batch(db_session, sample_statement, classifier):
+    """Test batch classification with rules and merchant history."""
+    db_session.add(sample_statement)
+    db_session.add(Merchant(name='Liverpool', normalized_name='LIVERPOOL', category='compras', subcategory='departamental'))
+    db_session.flush()
+
+    transactions = [
+        _transaction(sample_statement, 'OXXO'),
+        _transaction(sample_statement, 'OXXO'),
+        _transaction(sample_statement, 'LIVERPOOL'),
+        _transaction(sample_statement, 'TIENDA DESCONOCIDA'),
+        _transaction(sample_statement, ''),
+    ]
+    db_session.add_all(transactions)
+
+    count = classifier.classify_batch(db_session, transactions)
+    db_session.commit()
+
+    assert count == 3
+    oxxo, oxxo_again, liverpool, unknown, empty = transactions
+
+    assert (oxxo.category, oxxo.classification_source) == ('gastos_hormiga', 'rule_engine')
+    # The first OXXO teaches the merchant, the second one reuses it
+    assert oxxo_again.classification_source == 'merchant_history'
+    assert oxxo.merchant_id == oxxo_again.merchant_id
+
+    assert (liverpool.category, liverpool.classification_source) == ('compras', 'merchant_history')
+
+    assert unknown.category is None
+    assert unknown.merchant_id is not None
+    assert empty.merchant_id is None
+
+    assert db_session.query(Merchant).count() == 3
+    assert db_session.query(Merchant).filter_by(normalized_name='OXXO').one().category == 'gastos_hormiga'
+
+
+def test_classify_transaction(db_session, sample_statement, classifier):
+    """Test single transaction classification."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    transaction = _transaction(sample_statement, 'OXXO')
+    db_session.add(transaction)
+
+    assert classifier.classify_transaction(db_session, transaction) is True
+    assert transaction.category == 'gastos_hormiga'
+    assert classifier.classify_transaction(db_session, _transaction(sample_statement, 'OTRA TIENDA')) is False
+
+
+class _FakeLLM:
+    """Records batches and answers every transaction with one category."""
+
+    def __init__(self):
+        self.batches = []
+
+    def classify_batch(self, transactions, max_batch_size=20):
+        self.batches.append(transactions)
+        return [('servicios', 'streaming', 0.9) for _ in transactions]
+
+
+def test_classify_batch_llm_fallback(db_session, sample_statement, classifier):
+    """Test unclassified transactions go to the LLM and teach their merchant."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    classifier.use_llm = True
+    classifier.llm_classifier = _FakeLLM()
+
+    transactions = [
+        _transaction(sample_statement, 'NETFLIX'),
+        _transaction(sample_statement, 'OXXO'),
+        _transaction(sample_statement, 'SPOTIFY'),
+        _transaction(sample_statement, 'NETFLIX'),
+    ]
+    db_session.add_all(transactions)
+
+    assert classifier.classify_batch(db_session, transactions) == 4
+
+    netflix = transactions[0]
+    assert (netflix.category, netflix.classification_source) == ('servicios', 'llm')
+    assert transactions[3].classification_source == 'llm'
+    # Repeated descriptions are sent once
+    assert [t[1] for t in classifier.llm_classifier.batches[0]] == ['NETFLIX', 'SPOTIFY']
+    assert db_session.query(Merchant).filter_by(normalized_name='NETFLIX').one().category == 'servicios'
+
+
+def test_classify_batch_teaches_existing_merchant(db_session, sample_statement, classifier):
+    """Test rules fill in the category of a merchant already in the database."""
+    db_session.add(sample_statement)
+    db_session.add(Merchant(name='Oxxo', normalized_name='OXXO'))
+    db_session.commit()
+
+    transaction = _transaction(sample_statement, 'OXXO')
+    db_session.add(transaction)
+    classifier.classify_batch(db_session, [transaction])
+    db_session.commit()
+
+    merchant = db_session.query(Merchant).one()
+    assert (merchant.category, merchant.subcategory) == ('gastos_hormiga', 'conveniencia')
+    assert transaction.merchant_id == merchant.id
+
+
+def test_classify_deferred(db_session, sample_statement, classifier):
+    """Test transactions deferred from several batches share one LLM request."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    classifier.use_llm = True
+    classifier.llm_classifier = _FakeLLM()
+
+    deferred = []
+    first = [_transaction(sample_statement, 'NETFLIX'), _transaction(sample_statement, 'OXXO')]
+    second = [_transaction(sample_statement, 'SPOTIFY'), _transaction(sample_statement, 'NETFLIX')]
+    assert classifier.classify_batch(db_session, first, deferred=deferred) == 1
+    assert classifier.classify_batch(db_session, second, deferred=deferred) == 0
+    assert classifier.llm_classifier.batches == []
+
+    assert classifier.classify_deferred(db_session, deferred) == 3
+    assert [t[1] for t in classifier.llm_classifier.batches[0]] == ['NETFLIX', 'SPOTIFY']
+    assert second[1].classification_source == 'llm'
+    assert db_session.query(Merchant).filter_by(normalized_name='SPOTIFY').one().category == 'servicios'
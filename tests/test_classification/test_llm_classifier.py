@@ -0,0 +1,135 @@
+"""Tests for the LLM classifier."""
+
+import json
+import pytest
+from fin.classification.llm_classifier import LLMClassifier
+
+
+class _RecordingLLMClassifier(LLMClassifier):
+    """LLMClassifier that answers from a dict instead of calling Ollama."""
+
+    def __init__(self, answers, **kwargs):
+        kwargs.setdefault('cache_path', None)
+        super().__init__(**kwargs)
+        self.answers = answers
+        self.prompts = []
+
+    def _call_ollama(self, prompt):
+        self.prompts.append(prompt)
+        listed = prompt.split('TRANSACCIONES:')[1].split('INSTRUCCIONES:')[0]
+        lines = [line for line in listed.split('\n') if line.strip()]
+        items = []
+        for idx, line in enumerate(lines, 1):
+            description = line.split('. ', 1)[1].rsplit(' - $', 1)[0]
+            category = self.answers.get(description)
+            items.append({'id': idx, 'category': category, 'subcategory': 'x', 'confidence': 0.9})
+        return json.dumps(items)
+
+
+def _trans(description, amount=100.0):
+    return (0, description, amount)
+
+
+def test_classify_batch_reuses_cached_transactions():
+    """Test results are cached per transaction, not per batch."""
+    llm = _RecordingLLMClassifier({'NETFLIX': 'entretenimiento', 'UBER': 'transporte'})
+
+    first = llm.classify_batch([_trans('NETFLIX')])
+    second = llm.classify_batch([_trans('UBER'), _trans('NETFLIX')])
+
+    assert first == [('entretenimiento', 'x', 0.9)]
+    assert second == [('transporte', 'x', 0.9), ('entretenimiento', 'x', 0.9)]
+    # The second call only asked for the new transaction
+    assert len(llm.prompts) == 2
+    assert 'NETFLIX' not in llm.prompts[1]
+
+
+def test_unanswered_results_are_not_cached():
+    """Test transactions the LLM could not classify are retried."""
+    llm = _RecordingLLMClassifier({})
+
+    assert llm.classify_batch([_trans('DESCONOCIDO')]) == [(None, 'x', 0.9)]
+    llm.classify_batch([_trans('DESCONOCIDO')])
+
+    assert len(llm.prompts) == 2
+
+
+def test_cache_is_bounded():
+    """Test the least recently used entries are evicted."""
+    llm = _RecordingLLMClassifier({'A': 'a', 'B': 'b', 'C': 'c'}, cache_size=2)
+
+    llm.classify_batch([_trans('A'), _trans('B')])
+    llm.classify_batch([_trans('A')])  # A is now the most recently used
+    llm.classify_batch([_trans('C')])
+
+    assert len(llm._cache) == 2
+    assert ('B', 100.0) not in llm._cache
+    assert ('A', 100.0) in llm._cache
+
+
+def test_classify_batch_splits_into_sub_batches():
+    """Test large batches are split and results keep their order."""
+    answers = {f'COMERCIO {i}': f'cat{i}' for i in range(45)}
+    llm = _RecordingLLMClassifier(answers)
+
+    results = llm.classify_batch([_trans(d) for d in answers], max_batch_size=20)
+
+    assert [category for category, _, _ in results] == list(answers.values())
+    assert len(llm.prompts) == 3
+
+
+def test_parse_response():
+    """Test the JSON array is extracted from surrounding text."""
+    llm = LLMClassifier(cache_path=None)
+    response = 'Claro:\n[{"id": 1, "category": "salud", "subcategory": "farmacia", "confidence": 0.8}]\nListo'
+
+    assert llm._parse_response(response, 2) == [('salud', 'farmacia', 0.8), (None, None, 0.0)]
+    assert llm._parse_response('[{"id": 1,', 1) == [(None, None, 0.0)]
+
+
+def test_disk_cache_survives_new_instances(tmp_path):
+    """Test answers are reused by a new classifier with the same cache file."""
+    cache_path = str(tmp_path / "cache" / "llm.db")
+    first = _RecordingLLMClassifier({'NETFLIX': 'entretenimiento'}, cache_path=cache_path)
+    first.classify_batch([_trans('NETFLIX')])
+
+    second = _RecordingLLMClassifier({}, cache_path=cache_path)
+    assert second.classify_batch([_trans('NETFLIX')]) == [('entretenimiento', 'x', 0.9)]
+    assert second.prompts == []
+
+    # Results are cached per model
+    other_model = _RecordingLLMClassifier({}, cache_path=cache_path, model='llama3')
+    other_model.classify_batch([_trans('NETFLIX')])
+    assert len(other_model.prompts) == 1
+
+
+class _StreamingResponse:
+    """Streams Ollama-style JSON lines, failing if read past the limit."""
+
+    def __init__(self, tokens, limit):
+        self.tokens = tokens
+        self.limit = limit
+
+    def iter_lines(self):
+        yield b''
+        for i, token in enumerate(self.tokens):
+            assert i < self.limit, "read past the end of the JSON array"
+            yield json.dumps({'response': token, 'done': False}).encode()
+        yield json.dumps({'response': '', 'done': True}).encode()
+
+
+def test_read_stream_stops_at_complete_array():
+    """Test the stream is abandoned once a full JSON array arrived."""
+    llm = LLMClassifier(cache_path=None)
+    tokens = ['[{"id": 1, "category": "a]', '", "confidence": 0.9}', ']', ' extra']
+
+    text = llm._read_stream(_StreamingResponse(tokens, limit=3))
+
+    assert llm._parse_response(text, 1) == [('a]', None, 0.9)]
+
+
+def test_read_stream_until_done():
+    """Test responses without an array are read to the end."""
+    llm = LLMClassifier(cache_path=None)
+
+    assert llm._read_stream(_StreamingResponse(['no ', 'json'], limit=2)) == 'no json'
@@ -0,0 +1,125 @@
+"""Tests for the rule engine."""
+
+import pytest
+from fin.classification import RuleEngine
+
+
+RULES_YAML = """
+rules:
+  - pattern: 'UBER|DIDI'
+    category: 'transporte'
+    subcategory: 'rideshare'
+    priority: 5
+
+  - pattern: 'UBER.*EATS|RAPPI'
+    category: 'alimentacion'
+    subcategory: 'delivery'
+    priority: 20
+
+  - pattern: 'OXXO'
+    category: 'gastos_hormiga'
+    subcategory: 'conveniencia'
+
+  - pattern: '(unclosed'
+    category: 'roto'
+    subcategory: 'roto'
+    priority: 100
+"""
+
+
+@pytest.fixture
+def rule_engine(tmp_path):
+    """Rule engine loaded from a temporary rules file."""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(RULES_YAML, encoding='utf-8')
+    return RuleEngine(rules_file=str(rules_file))
+
+
+def test_classify_match(rule_engine):
+    """Test a description matching a single rule."""
+    assert rule_engine.classify("OXXO CENTRO") == ('gastos_hormiga', 'conveniencia', 1.0)
+
+
+def test_classify_priority(rule_engine):
+    """Test the highest priority matching rule wins."""
+    assert rule_engine.classify("UBER EATS MX") == ('alimentacion', 'delivery', 1.0)
+    assert rule_engine.classify("UBER TRIP") == ('transporte', 'rideshare', 1.0)
+
+
+def test_classify_case_insensitive(rule_engine):
+    """Test patterns ignore case."""
+    assert rule_engine.classify("rappi restaurante")[0] == 'alimentacion'
+
+
+def test_classify_no_match(rule_engine):
+    """Test descriptions without a matching rule."""
+    assert rule_engine.classify("LIVERPOOL") == (None, None, 0.0)
+    assert rule_engine.classify("") == (None, None, 0.0)
+    assert rule_engine.classify(None) == (None, None, 0.0)
+
+
+def test_classify_many(rule_engine):
+    """Test batch classification keeps the input order."""
+    results = rule_engine.classify_many(["OXXO CENTRO", None, "UBER EATS MX", "OXXO CENTRO"])
+
+    assert results == [
+        ('gastos_hormiga', 'conveniencia', 1.0),
+        (None, None, 0.0),
+        ('alimentacion', 'delivery', 1.0),
+        ('gastos_hormiga', 'conveniencia', 1.0),
+    ]
+
+
+def test_missing_rules_file(tmp_path):
+    """Test a missing rules file yields an engine that matches nothing."""
+    engine = RuleEngine(rules_file=str(tmp_path / "missing.yaml"))
+    assert engine.rules == []
+    assert engine.classify("OXXO") == (None, None, 0.0)
+
+
+def test_classify_priority_over_position(rule_engine):
+    """Test a higher priority rule wins even when it matches later in the text."""
+    assert rule_engine.classify("UBER RAPPI") == ('alimentacion', 'delivery', 1.0)
+    assert rule_engine.classify("OXXO UBER") == ('transporte', 'rideshare', 1.0)
+
+
+def test_classify_uncombinable_patterns(tmp_path):
+    """Test rules with backreferences are still matched in priority order."""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "rules:\n"
+        "  - {pattern: '(AB)\\1', category: 'doble', subcategory: 'ab', priority: 10}\n"
+        "  - {pattern: 'AB', category: 'simple', subcategory: 'ab', priority: 1}\n",
+        encoding='utf-8'
+    )
+    engine = RuleEngine(rules_file=str(rules_file))
+
+    assert engine.classify("XABAB") == ('doble', 'ab', 1.0)
+    assert engine.classify("XAB") == ('simple', 'ab', 1.0)
+
+
+def test_classify_without_hyperscan(tmp_path, monkeypatch):
+    """Test the pure-regex path gives the same results."""
+    monkeypatch.setattr('fin.classification.rules.HYPERSCAN_AVAILABLE', False)
+    monkeypatch.setattr('fin.classification.rules.RE2_AVAILABLE', False)
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(RULES_YAML, encoding='utf-8')
+    engine = RuleEngine(rules_file=str(rules_file))
+
+    assert engine.classify("UBER RAPPI") == ('alimentacion', 'delivery', 1.0)
+    assert engine.classify("oxxo uber") == ('transporte', 'rideshare', 1.0)
+    assert engine.classify("LIVERPOOL") == (None, None, 0.0)
+
+
+def test_classify_with_re2(tmp_path, monkeypatch):
+    """Test the RE2 set path gives the same results."""
+    pytest.importorskip('re2')
+    monkeypatch.setattr('fin.classification.rules.HYPERSCAN_AVAILABLE', False)
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(RULES_YAML, encoding='utf-8')
+    engine = RuleEngine(rules_file=str(rules_file))
+
+    assert engine._re2_set is not None
+    assert engine.classify("UBER RAPPI") == ('alimentacion', 'delivery', 1.0)
+    assert engine.classify("oxxo uber") == ('transporte', 'rideshare', 1.0)
+    assert engine.classify("LIVERPOOL") == (None, None, 0.0)
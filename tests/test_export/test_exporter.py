@@ -0,0 +1,40 @@
+"""Tests for data export."""
+
+from fin.export import DataExporter
+import json
+
+
+def test_export_transactions_json_layout(db_session, sample_statement, sample_transaction):
+    """Test streamed JSON matches json.dumps of the whole list."""
+    db_session.add_all([sample_statement, sample_transaction])
+    db_session.flush()
+    sample_transaction.statement_id = sample_statement.id
+    db_session.flush()
+
+    result = DataExporter(db_session).export_transactions(format='json')
+
+    data = json.loads(result)
+    assert result == json.dumps(data, indent=2, ensure_ascii=False)
+    assert data[0]['description'] == "AMAZON MEXICO"
+    assert data[0]['bank'] == "bbva"
+    assert data[0]['card_last_4'] == "1234"
+
+
+def test_export_empty_json(db_session):
+    """Test an export without rows is an empty JSON array."""
+    assert DataExporter(db_session).export_transactions(format='json') == "[]"
+    assert DataExporter(db_session).export_msi(format='json') == "[]"
+
+
+def test_export_msi_csv(db_session, sample_statement, sample_installment_plan):
+    """Test installment plans export as CSV with their bank."""
+    db_session.add_all([sample_statement, sample_installment_plan])
+    db_session.flush()
+    sample_installment_plan.statement_id = sample_statement.id
+    db_session.flush()
+
+    lines = DataExporter(db_session).export_msi(format='csv').splitlines()
+
+    assert lines[0].startswith("description,status")
+    assert lines[1].startswith("SPORT CITY UNIVERSITY,active,12000.0,1000.0,12,5,")
+    assert lines[1].endswith(",bbva")
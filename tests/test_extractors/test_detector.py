@@ -0,0 +1,32 @@
+"""Tests for bank detection."""
+
+import pytest
+from fin.extractors import BankDetector
+from fin.extractors.banamex import BanamexExtractor
+
+
+def _write_out_of_order_pdf(path):
+    """Write a PDF drawing 'Estado de Cuenta' and 'Mensual' apart in the content stream."""
+    pymupdf = pytest.importorskip("pymupdf")
+    doc = pymupdf.open()
+    page = doc.new_page()
+    page.insert_text((72, 100), "Estado de Cuenta", fontsize=11)
+    page.insert_text((72, 200), "Resumen del periodo", fontsize=11)
+    # Same visual line as the first text, but drawn after another line
+    x = 72 + pymupdf.get_text_length("Estado de Cuenta ", fontsize=11)
+    page.insert_text((x, 100), "Mensual", fontsize=11)
+    page.insert_text((72, 300), "Número de tarjeta: 5204", fontsize=11)
+    doc.save(str(path))
+    doc.close()
+
+
+@pytest.mark.parametrize("pymupdf_available", [True, False])
+def test_detect_text_in_visual_order(tmp_path, monkeypatch, pymupdf_available):
+    """Test detection reads page text in visual order, with or without PyMuPDF."""
+    pdf_path = tmp_path / "statement.pdf"
+    _write_out_of_order_pdf(pdf_path)
+    monkeypatch.setattr('fin.extractors.base.PYMUPDF_AVAILABLE', pymupdf_available)
+
+    extractor = BankDetector().detect(str(pdf_path))
+
+    assert isinstance(extractor, BanamexExtractor)
@@ -74,3 +74,45 @@ def test_statement_transaction_relationship(db_session, sample_statement, sample
     statement = db_session.query(Statement).first()
     assert len(statement.transactions) == 1
     assert statement.transactions[0].description == "AMAZON MEXICO"
+
+
+def test_init_db_adds_missing_columns(tmp_path):
+    """Test init_db upgrades tables created by older versions."""
+    from sqlalchemy import create_engine, inspect, text
+    from fin.models import init_db
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE processing_log (id VARCHAR PRIMARY KEY, file_path VARCHAR NOT NULL, file_hash VARCHAR NOT NULL)"))
+        conn.execute(text("CREATE INDEX idx_processing_file_hash ON processing_log (file_hash)"))
+
+    init_db(engine)
+
+    columns = {column['name'] for column in inspect(engine).get_columns('processing_log')}
+    assert {'file_size', 'mtime_ns', 'processed_at'} <= columns
+    indexes = {index['name'] for index in inspect(engine).get_indexes('processing_log')}
+    assert {'idx_processing_hash_algo', 'idx_processing_file_stat'} <= indexes
+    assert 'idx_processing_file_hash' not in indexes
+
+
+def test_init_db_converts_hex_file_hashes(tmp_path):
+    """Test hex file hashes from older versions become raw digests."""
+    from sqlalchemy import create_engine, text
+    from fin.models import init_db, get_session, ProcessingLog
+    from fin.models.database import RAW_FILE_HASH_VERSION
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE processing_log (id VARCHAR PRIMARY KEY, file_path VARCHAR NOT NULL, file_hash VARCHAR NOT NULL)"))
+        conn.execute(text("INSERT INTO processing_log VALUES ('1', 'a.pdf', 'ab01'), ('2', 'b.pdf', '')"))
+
+    init_db(engine)
+
+    session = get_session(engine)
+    hashes = {log.file_path: log.file_hash for log in session.query(ProcessingLog)}
+    session.close()
+    assert hashes == {'a.pdf': b'\xab\x01', 'b.pdf': b''}
+
+    # Recorded, so later init_db calls skip the table scan
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA user_version")).scalar() == RAW_FILE_HASH_VERSION
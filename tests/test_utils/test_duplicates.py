@@ -0,0 +1,53 @@
+"""Tests for duplicate and reversal detection."""
+
+from fin.models import Statement, Transaction
+from fin.utils.duplicates import detect_all
+from decimal import Decimal
+from datetime import date
+
+
+def _add_transaction(session, statement, day, amount, description):
+    """Add a transaction to the session."""
+    transaction = Transaction()
+    transaction.statement_id = statement.id
+    transaction.date = day
+    transaction.description = description
+    transaction.description_normalized = description
+    transaction.amount = Decimal(str(amount))
+    transaction.transaction_type = 'expense'
+    session.add(transaction)
+    return transaction
+
+
+def test_detect_all_several_statements(db_session, sample_statement):
+    """Test statements checked together are still checked separately."""
+    other = Statement(bank='bbva', source_type='credit_card', period_start=date(2025, 11, 1),
+                      period_end=date(2025, 11, 30), source_file='/path/to/other.pdf')
+    db_session.add_all([sample_statement, other])
+    db_session.flush()
+
+    first = _add_transaction(db_session, sample_statement, date(2025, 12, 2), 100, 'OXXO')
+    copy = _add_transaction(db_session, sample_statement, date(2025, 12, 2), 100, 'OXXO')
+    charge = _add_transaction(db_session, sample_statement, date(2025, 12, 3), 500, 'AMAZON')
+    refund = _add_transaction(db_session, sample_statement, date(2025, 12, 5), -500, 'AMAZON')
+    # Same as the first, but in another statement
+    elsewhere = _add_transaction(db_session, other, date(2025, 12, 2), 100, 'OXXO')
+    db_session.flush()
+
+    results = detect_all(db_session, statement_ids=[sample_statement.id, other.id])
+
+    assert results == {'duplicates': 1, 'reversals': 2, 'total_flagged': 3}
+    assert copy.is_duplicate and not first.is_duplicate and not elsewhere.is_duplicate
+    assert charge.is_reversal and refund.is_reversal
+    assert refund.related_transaction_id == charge.id
+
+
+def test_detect_all_single_statement(db_session, sample_statement):
+    """Test a single statement id is still accepted."""
+    db_session.add(sample_statement)
+    db_session.flush()
+    _add_transaction(db_session, sample_statement, date(2025, 12, 2), 100, 'OXXO')
+    _add_transaction(db_session, sample_statement, date(2025, 12, 2), 100, 'OXXO')
+    db_session.flush()
+
+    assert detect_all(db_session, sample_statement.id)['duplicates'] == 1